@@ -10,6 +10,14 @@ app.config.from_object(Config)
 init_db(app)
 from database.models import db
 
+# Per-route/per-stage latency histograms and cache counters on /metrics
+from utils.metrics import init_app as init_metrics
+init_metrics(app)
+
+# Opt-in per-request profiles (no hooks at all unless configured)
+from utils.profiling import init_app as init_profiling
+init_profiling(app)
+
 # Import routes
 from routes import auth, dashboard, prediction, weather, analysis, api
 app.register_blueprint(auth.bp)
@@ -19,6 +27,11 @@ app.register_blueprint(weather.bp)
 app.register_blueprint(analysis.bp)
 app.register_blueprint(api.bp)
 
+# Fill actual prices into stored predictions as they arrive
+if Config.ACCURACY_BACKFILL_INTERVAL:
+    from database.predictions import start_accuracy_backfill
+    start_accuracy_backfill(app)
+
 # Main route
 @app.route('/')
 def index():
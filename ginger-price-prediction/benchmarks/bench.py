@@ -0,0 +1,221 @@
+"""
+Micro- and macro-benchmarks of the hot paths at several data scales
+
+Each scale (years x markets) gets its own synthetic dataset in a scratch
+directory. Results are written as JSON; comparing against a saved baseline
+fails the run (exit code 1) when a benchmark's median is slower than the
+baseline by more than the threshold.
+
+    python -m benchmarks.bench --save-baseline          # record a baseline
+    python -m benchmarks.bench                          # compare against it
+    python -m benchmarks.bench --scales 1x1 5x5 --threshold 0.1
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from benchmarks.harness import create_app, write_dataset
+
+DEFAULT_SCALES = ['1x1', '5x1', '20x1', '1x10', '5x10', '20x10']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+def _time(fn, repeat, setup=None):
+    """
+    Run fn `repeat` times (after one untimed warm-up) and return timings in ms
+    """
+    if setup:
+        setup()
+    result = fn()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+def _summary(timings, **extra):
+    return dict({
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'runs': len(timings)
+    }, **extra)
+
+def run_scale(years, markets, repeat, workdir):
+    """
+    Time every benchmark on one dataset; returns {name: summary}
+    """
+    from utils.data_loader import load_historical_data, clear_dataset_cache
+    from utils.weather_api import get_historical_weather
+    from models.train_model import (create_sequences, train_lstm_model, predict_ginger_price,
+                                    evaluate_model, forecast_cache, model_registry)
+
+    data_dir = os.path.join(workdir, f"{years}y-{markets}m")
+    app = create_app(data_dir)
+    # Failing requests are skipped with a warning instead of tracebacks
+    app.logger.setLevel(logging.CRITICAL)
+    rows, _ = write_dataset(data_dir, years, markets)
+    results = {}
+
+    timings, data = _time(load_historical_data, repeat, setup=clear_dataset_cache)
+    results['load_historical_data.cold'] = _summary(timings, rows=rows)
+    timings, data = _time(load_historical_data, repeat)
+    results['load_historical_data.warm'] = _summary(timings, rows=rows)
+
+    market = data[data['location'] == data['location'].iloc[0]]
+    prices = market['price'].values
+    timings, _ = _time(lambda: create_sequences(prices, 60), repeat)
+    results['create_sequences'] = _summary(timings, rows=len(prices))
+
+    # Training is the slowest path; fewer repeats keep the suite practical
+    timings, _ = _time(lambda: train_lstm_model(market), max(1, repeat // 2))
+    results['train_lstm_model'] = _summary(timings, rows=len(prices))
+
+    timings, _ = _time(lambda: predict_ginger_price(30, 'lstm'), repeat, setup=forecast_cache.invalidate)
+    results['predict_ginger_price.uncached'] = _summary(timings)
+    timings, _ = _time(lambda: predict_ginger_price(30, 'lstm'), repeat)
+    results['predict_ginger_price.cached'] = _summary(timings)
+
+    rng = np.random.default_rng(0)
+    predicted = prices * (1 + rng.normal(0, 0.02, len(prices)))
+    timings, _ = _time(lambda: evaluate_model(prices, predicted), repeat)
+    results['evaluate_model'] = _summary(timings, rows=len(prices))
+
+    end = datetime.now().date()
+    start = end - timedelta(days=int(years * 365) - 1)
+    # The warm-up call backfills the WeatherData table; timed calls read it back
+    with app.app_context():
+        timings, _ = _time(lambda: get_historical_weather(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')), repeat)
+    results['get_historical_weather'] = _summary(timings, rows=int(years * 365))
+
+    client = app.test_client()
+    requests = {
+        'request.api_predict': lambda: client.post('/api/predict', json={'days_ahead': 7, 'model_type': 'lstm'}),
+        'request.dashboard': lambda: client.get('/dashboard')
+    }
+    for name, call in requests.items():
+        timings, response = _time(call, repeat)
+        if response.status_code != 200:
+            # An error path is no baseline: leave it out rather than time it
+            print(f"skipped {name}: HTTP {response.status_code}", file=sys.stderr)
+            continue
+        results[name] = _summary(timings)
+
+    model_registry.clear()
+    forecast_cache.invalidate()
+    clear_dataset_cache()
+    return results
+
+def run(scales=DEFAULT_SCALES, repeat=5, workdir=None):
+    """
+    Run every scale and return the results document
+    """
+    cleanup = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix='ginger-bench-')
+    results = {}
+    try:
+        for scale in scales:
+            years, markets = (int(part) for part in scale.lower().split('x'))
+            started = time.perf_counter()
+            for name, summary in run_scale(years, markets, repeat, workdir).items():
+                results[f"{name}@{scale}"] = summary
+            print(f"scale {scale}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+def compare(current, baseline, threshold=0.25, min_delta_ms=1.0):
+    """
+    Regressions of current against baseline as a list of dicts
+
+    A benchmark regresses when its median exceeds the baseline median by
+    more than threshold (a fraction, overridable per benchmark through the
+    baseline's "thresholds" map) and by at least min_delta_ms, so sub-ms
+    noise never fails a run.
+    """
+    overrides = baseline.get('thresholds', {})
+    regressions = []
+    for name, summary in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        limit = overrides.get(name.split('@')[0], overrides.get(name, threshold))
+        old, new = reference['median_ms'], summary['median_ms']
+        if new > old * (1 + limit) and new - old >= min_delta_ms:
+            regressions.append({'name': name, 'baseline_ms': old, 'current_ms': new,
+                                'change': round(new / old - 1, 3) if old else None, 'threshold': limit})
+    return regressions
+
+def _print_table(current, baseline=None):
+    for name, summary in current['results'].items():
+        line = f"{name:<48} {summary['median_ms']:>10.3f} ms"
+        reference = (baseline or {}).get('results', {}).get(name)
+        if reference:
+            change = summary['median_ms'] / reference['median_ms'] - 1 if reference['median_ms'] else 0
+            line += f"   baseline {reference['median_ms']:>10.3f} ms  {change:+.1%}"
+        print(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths at several data scales')
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES, help='YEARSxMARKETS, e.g. 5x10')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--output', default=None, help='also write the results to this JSON file')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_REGRESSION_THRESHOLD', 0.25)),
+                        help='allowed slowdown as a fraction of the baseline median')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    parser.add_argument('--workdir', default=None, help='keep generated data here instead of a temp dir')
+    args = parser.parse_args()
+
+    current = run(args.scales, args.repeat, args.workdir)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        _print_table(current)
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    _print_table(current, baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        sys.exit(0)
+
+    regressions = compare(current, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: {regression['baseline_ms']} ms -> "
+              f"{regression['current_ms']} ms ({regression['change']:+.1%}, limit {regression['threshold']:.0%})")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,75 @@
+"""
+Shared setup for benchmarks and load tests: a synthetic dataset on disk and
+a Flask app wired the way app.py wires it, without importing app.py (which
+registers blueprints that may not exist in every checkout) or touching the
+configured database.
+"""
+
+import os
+import numpy as np
+from config import Config
+from utils.synthetic_data import generate_and_write, market_names
+
+# Config attributes redirected under the scratch directory
+_PATH_SETTINGS = {
+    'DATA_PATH': '',
+    'MODEL_PATH': 'saved_models',
+    'PREDICTION_PATH': 'predictions',
+    'COLUMNAR_STORE_PATH': 'processed/columnar',
+    'FEATURE_STORE_PATH': 'processed/features',
+    'BACKTEST_RESULTS_PATH': 'processed/backtest_results.csv',
+    'PROFILE_DIR': 'profiles'
+}
+
+def use_data_dir(data_dir):
+    """
+    Point every data/model path in Config at data_dir
+    """
+    for name, relative in _PATH_SETTINGS.items():
+        path = os.path.join(data_dir, relative)
+        setattr(Config, name, path if os.path.splitext(path)[1] else os.path.join(path, ''))
+    os.makedirs(os.path.join(data_dir, 'raw'), exist_ok=True)
+
+def write_dataset(data_dir, years=1, markets=1, seed=42):
+    """
+    Write price and weather CSVs for `markets` markets over `years` years
+    ending today into data_dir/raw; returns (price rows, weather rows)
+    """
+    end = np.datetime64('today', 'D')
+    rows = generate_and_write(end - int(years * 365) + 1, end, market_names(markets), seed,
+                              output_format='csv', data_dir=data_dir)
+    return rows['prices'], rows['weather']
+
+def create_app(data_dir, metrics=False):
+    """
+    Build the web app against data_dir with a SQLite database inside it
+    """
+    from flask import Flask, render_template
+    from flask_login import AnonymousUserMixin
+    from database.models import init_db
+    from routes import auth, dashboard, prediction, weather, analysis
+    from routes.auth import get_current_user
+
+    use_data_dir(data_dir)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    app = Flask('app', root_path=root)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(os.path.join(data_dir, 'app.db'))
+    init_db(app)
+
+    for module in (auth, dashboard, prediction, weather, analysis):
+        app.register_blueprint(module.bp)
+
+    @app.route('/')
+    def index():
+        return render_template('dashboard/index.html')
+
+    @app.context_processor
+    def inject_user():
+        # The templates expect Flask-Login's current_user
+        return {'current_user': get_current_user() or AnonymousUserMixin()}
+
+    if metrics:
+        from utils.metrics import init_app as init_metrics
+        init_metrics(app)
+    return app
@@ -0,0 +1,196 @@
+"""
+Local load generator for sizing deployments
+
+Starts the app on a local port (or targets --url, e.g. a gunicorn started
+against the same data), points utils.weather_api at a StubWeatherServer
+with injectable latency and error rate, then drives a weighted mix of routes
+from --concurrency threads for --duration seconds. Reports throughput and
+p50/p95/p99 latency per route. Nothing leaves the machine.
+
+    python -m benchmarks.loadtest --concurrency 16 --duration 30 \\
+        --mix dashboard=4 weather=2 predict=1 api_predict=2 login=1 --weather-latency 0.2
+"""
+
+import argparse
+import json
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import requests
+from config import Config
+from benchmarks.harness import create_app, write_dataset
+from utils.weather_stub import StubWeatherServer
+
+LOAD_USER = {'username': 'loadtest', 'email': 'loadtest@example.com', 'password': 'loadtest-password'}
+
+# Route name -> (method, path, request kwargs)
+ROUTES = {
+    'dashboard': ('GET', '/dashboard', {}),
+    'weather': ('GET', '/weather', {}),
+    'predict': ('POST', '/predict', {'data': {'days_ahead': 7, 'model_type': 'lstm'}}),
+    'api_predict': ('POST', '/api/predict', {'json': {'days_ahead': 7, 'model_type': 'lstm'}}),
+    'login': ('POST', '/login', {'data': {'username': LOAD_USER['username'], 'password': LOAD_USER['password']}})
+}
+
+DEFAULT_MIX = {'dashboard': 4, 'weather': 2, 'predict': 1, 'api_predict': 2, 'login': 1}
+
+def parse_mix(values):
+    """
+    ['dashboard=4', 'weather=1'] -> {'dashboard': 4.0, 'weather': 1.0}
+    """
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route '{name}'; expected one of {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def _create_user(app):
+    from database.models import db, User
+    with app.app_context():
+        if User.query.filter_by(username=LOAD_USER['username']).first() is None:
+            user = User(username=LOAD_USER['username'], email=LOAD_USER['email'])
+            user.set_password(LOAD_USER['password'])
+            db.session.add(user)
+            db.session.commit()
+
+def start_app(data_dir, years, markets):
+    """
+    Serve the app from a threaded local server; returns (base_url, server)
+    """
+    from werkzeug.serving import make_server
+
+    app = create_app(data_dir)
+    app.logger.setLevel(logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    write_dataset(data_dir, years, markets)
+    _create_user(app)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+def _worker(base_url, names, weights, deadline, seed, samples, lock):
+    rng = random.Random(seed)
+    session = requests.Session()
+    local = []
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, kwargs = ROUTES[name]
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, allow_redirects=False, timeout=60, **kwargs)
+            response.content
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        local.append((name, time.perf_counter() - started, status))
+    with lock:
+        samples.extend(local)
+
+def run_load(base_url, mix, concurrency=8, duration=10.0, seed=42):
+    """
+    Drive the mix for `duration` seconds; returns the per-route report
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    # One request per route first so model training and cold caches aren't measured
+    with requests.Session() as session:
+        for name in names:
+            method, path, kwargs = ROUTES[name]
+            session.request(method, base_url + path, allow_redirects=False, timeout=300, **kwargs)
+
+    samples, lock = [], threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [threading.Thread(target=_worker, args=(base_url, names, weights, deadline, seed + i, samples, lock))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {'concurrency': concurrency, 'duration_s': round(elapsed, 3), 'routes': {}}
+    for name in names + ['total']:
+        rows = [s for s in samples if name == 'total' or s[0] == name]
+        if not rows:
+            continue
+        latencies = np.array([s[1] for s in rows]) * 1000
+        statuses = [s[2] for s in rows]
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report['routes'][name] = {
+            'requests': len(rows),
+            'rps': round(len(rows) / elapsed, 2),
+            'errors': sum(1 for status in statuses if status == 0 or status >= 500),
+            'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2)
+        }
+    return report
+
+def _print_report(report, upstream_requests=None):
+    print(f"{report['concurrency']} workers for {report['duration_s']}s")
+    print(f"{'route':<12} {'requests':>9} {'req/s':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for name, row in report['routes'].items():
+        print(f"{name:<12} {row['requests']:>9} {row['rps']:>9.1f} {row['errors']:>7} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}  {row['statuses']}")
+    if upstream_requests is not None:
+        print(f"stub weather provider served {upstream_requests} requests")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate reproducible local load and report latency percentiles')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of measured load')
+    parser.add_argument('--mix', nargs='+', default=None, help='route=weight pairs, e.g. dashboard=4 login=1')
+    parser.add_argument('--url', default=None, help='target an already running server instead of starting one')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--markets', type=int, default=1)
+    parser.add_argument('--weather-latency', type=float, default=0.05, help='stub provider delay in seconds')
+    parser.add_argument('--weather-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='write the report as JSON')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+
+    with StubWeatherServer(latency=args.weather_latency, error_rate=args.weather_error_rate, seed=args.seed) as stub:
+        # Route weather calls through the stub (only affects an in-process app)
+        from utils import weather_api
+        Config.WEATHER_API_BASE_URL = stub.base_url
+        Config.WEATHER_API_KEY = Config.WEATHER_API_KEY or 'stub'
+        weather_api.weather_client = weather_api.WeatherClient()
+        print(f"stub weather provider on {stub.base_url}", file=sys.stderr)
+
+        workdir, server = None, None
+        base_url = args.url
+        if base_url is None:
+            workdir = tempfile.mkdtemp(prefix='ginger-load-')
+            base_url, server = start_app(workdir, args.years, args.markets)
+            print(f"app on {base_url} ({args.years} years x {args.markets} markets)", file=sys.stderr)
+
+        try:
+            report = run_load(base_url.rstrip('/'), mix, args.concurrency, args.duration, args.seed)
+        finally:
+            if server is not None:
+                server.shutdown()
+            if workdir is not None:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        report['mix'] = mix
+        report['weather_stub'] = {'latency': args.weather_latency, 'error_rate': args.weather_error_rate,
+                                  'requests': stub.requests}
+        _print_report(report, stub.requests)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
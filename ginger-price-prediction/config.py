@@ -15,14 +15,74 @@ class Config:
     # API Keys (to be set in .env file)
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY')
     
+    # Weather provider client
+    WEATHER_API_BASE_URL = os.environ.get('WEATHER_API_BASE_URL') or 'http://api.openweathermap.org/data/2.5'
+    WEATHER_CONNECT_TIMEOUT = float(os.environ.get('WEATHER_CONNECT_TIMEOUT', 2.0))  # seconds
+    WEATHER_READ_TIMEOUT = float(os.environ.get('WEATHER_READ_TIMEOUT', 5.0))  # seconds
+    WEATHER_MAX_RETRIES = int(os.environ.get('WEATHER_MAX_RETRIES', 2))
+    WEATHER_POOL_SIZE = int(os.environ.get('WEATHER_POOL_SIZE', 10))
+    WEATHER_MAX_CONCURRENCY = int(os.environ.get('WEATHER_MAX_CONCURRENCY', 8))  # upstream calls in flight
+    WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL', 600))  # seconds fresh
+    WEATHER_CACHE_STALE_TTL = int(os.environ.get('WEATHER_CACHE_STALE_TTL', 3600))  # seconds served stale
+    
+    # Ginger-producing regions tracked for bulk weather fetches
+    GINGER_REGIONS = [city.strip() for city in os.environ.get(
+        'GINGER_REGIONS', 'Jakarta,Bandung,Semarang,Boyolali,Magelang,Surabaya,Malang,Medan,Bengkulu,Lampung'
+    ).split(',') if city.strip()]
+    
     # Upload folder for CSV files
     UPLOAD_FOLDER = 'data/raw'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
     # Model configuration
     MODEL_PATH = 'models/saved_models/'
+    MODEL_CACHE_BYTES = int(os.environ.get('MODEL_CACHE_BYTES', 256 * 1024 * 1024))
+    FORECAST_CACHE_TTL = int(os.environ.get('FORECAST_CACHE_TTL', 300))  # seconds
+    FORECAST_CACHE_SIZE = int(os.environ.get('FORECAST_CACHE_SIZE', 1024))  # entries
+    MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 1000))
+    MAX_STREAM_DAYS = int(os.environ.get('MAX_STREAM_DAYS', 3650))  # longest horizon (plain, batch or streamed)
+    
+    # Points per chart series after server-side downsampling
+    CHART_DEFAULT_POINTS = int(os.environ.get('CHART_DEFAULT_POINTS', 200))
+    CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 2000))
+    
+    # Seconds between fills of actual prices/accuracy on stored predictions (0 disables)
+    ACCURACY_BACKFILL_INTERVAL = int(os.environ.get('ACCURACY_BACKFILL_INTERVAL', 3600))
+    
+    # Incremental updates flag a full retrain past these limits
+    DRIFT_MAPE_THRESHOLD = float(os.environ.get('DRIFT_MAPE_THRESHOLD', 10.0))  # percent
+    DRIFT_RANGE_THRESHOLD = float(os.environ.get('DRIFT_RANGE_THRESHOLD', 0.25))  # fraction of trained range
     DATA_PATH = 'data/'
     PREDICTION_PATH = 'data/predictions/'
+    COLUMNAR_STORE_PATH = 'data/processed/columnar/'
+    BACKTEST_RESULTS_PATH = 'data/processed/backtest_results.csv'
+    FEATURE_STORE_PATH = 'data/processed/features/'
+    SAMPLE_DATA_SEED = int(os.environ.get('SAMPLE_DATA_SEED', 42))  # synthetic fallback data
+    
+    # Weather/price feature store: price lags (rows), rolling rain sums and the
+    # trailing temperature mean behind the anomaly (days), and how far back the
+    # as-of join may look for a weather reading
+    FEATURE_LAGS = [int(lag) for lag in os.environ.get('FEATURE_LAGS', '1,7,14').split(',') if lag.strip()]
+    FEATURE_RAIN_WINDOWS = [int(days) for days in os.environ.get('FEATURE_RAIN_WINDOWS', '7,30').split(',') if days.strip()]
+    FEATURE_ANOMALY_WINDOW = int(os.environ.get('FEATURE_ANOMALY_WINDOW', 30))
+    FEATURE_ASOF_TOLERANCE_DAYS = int(os.environ.get('FEATURE_ASOF_TOLERANCE_DAYS', 3))
+    TRAIN_WITH_WEATHER_FEATURES = os.environ.get('TRAIN_WITH_WEATHER_FEATURES', 'False').lower() == 'true'
+    
+    # Metrics: with METRICS_DIR set, gunicorn workers share snapshots there so
+    # any worker can answer /metrics for all of them
+    METRICS_DIR = os.environ.get('METRICS_DIR') or None
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))  # seconds
+    METRICS_STALE_SECONDS = float(os.environ.get('METRICS_STALE_SECONDS', 60))  # drop exited workers' gauges
+    
+    # Per-request profiling, triggered by a PROFILE_HEADER token signed with
+    # PROFILE_SECRET (python -m utils.profiling) or by sampling; off by default
+    PROFILE_SECRET = os.environ.get('PROFILE_SECRET') or None
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))  # fraction of requests
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling')  # 'sampling' or 'cprofile'
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'data/profiles/')
+    PROFILE_HEADER = 'X-Profile-Token'
+    PROFILE_TOKEN_MAX_AGE = int(os.environ.get('PROFILE_TOKEN_MAX_AGE', 300))  # seconds
     
     # Application settings
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,119 @@
+import argparse
+import glob
+import os
+import time
+import pandas as pd
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from config import Config
+from database.models import db, GingerPrice, WeatherData
+
+DEFAULT_LOCATION = 'default'
+
+# CSV columns loaded into each table (besides date/location)
+_VALUE_COLUMNS = {
+    GingerPrice: ['price', 'source'],
+    WeatherData: ['temperature', 'humidity', 'rainfall']
+}
+
+def _insert_statement(table, update_columns):
+    """
+    INSERT ... ON CONFLICT (location, date) for the current database dialect
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        stmt = sqlite.insert(table)
+    elif dialect == 'postgresql':
+        stmt = postgresql.insert(table)
+    else:
+        # No portable upsert; plain insert relies on callers avoiding duplicates
+        return table.insert()
+
+    if update_columns:
+        return stmt.on_conflict_do_update(
+            index_elements=['location', 'date'],
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+    return stmt.on_conflict_do_nothing(index_elements=['location', 'date'])
+
+def upsert_rows(model, rows, update=True):
+    """
+    Insert rows (dicts) into a (location, date)-keyed table in one
+    executemany, updating or skipping rows that already exist. The caller
+    owns the transaction.
+    """
+    if not rows:
+        return 0
+    update_columns = [c for c in rows[0] if c not in ('location', 'date', 'created_at')] if update else []
+    db.session.execute(_insert_statement(model.__table__, update_columns), rows)
+    return len(rows)
+
+def _chunk_rows(chunk, model):
+    """
+    Convert a CSV chunk into insert parameter dicts
+    """
+    chunk['date'] = pd.to_datetime(chunk['date']).dt.date
+    if 'location' not in chunk.columns:
+        chunk['location'] = DEFAULT_LOCATION
+    chunk['location'] = chunk['location'].fillna(DEFAULT_LOCATION).astype(str)
+
+    columns = ['date', 'location'] + [c for c in _VALUE_COLUMNS[model] if c in chunk.columns]
+    # Last row wins for duplicate keys within a chunk, matching the upsert
+    chunk = chunk.drop_duplicates(['location', 'date'], keep='last')
+
+    now = datetime.utcnow()
+    values = [chunk[c].astype(object).where(chunk[c].notna(), None).tolist() for c in columns]
+    return [dict(zip(columns, row), created_at=now) for row in zip(*values)]
+
+def ingest_csv(path, model, chunk_size=50000):
+    """
+    Stream a CSV into a table in chunks of upserts, all in one transaction
+    """
+    started = time.perf_counter()
+    total = 0
+    try:
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            total += upsert_rows(model, _chunk_rows(chunk, model))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {'path': path, 'table': model.__tablename__, 'rows': total,
+            'seconds': time.perf_counter() - started}
+
+def ingest_raw_csvs(chunk_size=50000):
+    """
+    Load every harga_jahe_*.csv and data_cuaca_*.csv under DATA_PATH/raw
+    """
+    raw_dir = os.path.join(Config.DATA_PATH, 'raw')
+    results = []
+    for pattern, model in (('harga_jahe_*.csv', GingerPrice), ('data_cuaca_*.csv', WeatherData)):
+        for path in sorted(glob.glob(os.path.join(raw_dir, pattern))):
+            results.append(ingest_csv(path, model, chunk_size))
+    return results
+
+if __name__ == '__main__':
+    from flask import Flask
+    from database.models import init_db
+
+    parser = argparse.ArgumentParser(description='Bulk load price and weather CSVs into the database')
+    parser.add_argument('--prices', nargs='*', default=None, help='price CSVs (default: DATA_PATH/raw/harga_jahe_*.csv)')
+    parser.add_argument('--weather', nargs='*', default=None, help='weather CSVs (default: DATA_PATH/raw/data_cuaca_*.csv)')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    init_db(app)
+
+    with app.app_context():
+        if args.prices is None and args.weather is None:
+            results = ingest_raw_csvs(args.chunk_size)
+        else:
+            results = [ingest_csv(path, GingerPrice, args.chunk_size) for path in args.prices or []]
+            results += [ingest_csv(path, WeatherData, args.chunk_size) for path in args.weather or []]
+
+    for result in results:
+        rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+        print(f"{result['path']} -> {result['table']}: {result['rows']} rows in "
+              f"{result['seconds']:.2f}s ({rate:,.0f} rows/s)")
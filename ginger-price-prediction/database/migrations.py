@@ -0,0 +1,122 @@
+from sqlalchemy import inspect, text
+from database.models import db, Prediction, GingerPrice, WeatherData
+
+# Tables keyed by (location, date) through a unique index
+_LOCATION_DATE_MODELS = (GingerPrice, WeatherData)
+
+def _dedupe_location_date(connection, table):
+    """
+    Keep only the newest row per (location, date) so a unique index can be
+    built; returns the number of rows deleted
+
+    Rows without a location are left alone: NULLs never collide in a unique
+    index, and which of them belong to the same market can't be told here.
+    """
+    return connection.execute(text(
+        f"DELETE FROM {table} WHERE location IS NOT NULL AND id NOT IN "
+        f"(SELECT MAX(id) FROM {table} WHERE location IS NOT NULL GROUP BY location, date)"
+    )).rowcount
+
+def _null_location_duplicates(connection, table):
+    """
+    Rows without a location that share their date with another such row
+    """
+    return connection.execute(text(
+        f"SELECT COALESCE(SUM(n), 0) FROM (SELECT COUNT(*) AS n FROM {table} "
+        f"WHERE location IS NULL GROUP BY date HAVING COUNT(*) > 1) AS duplicates"
+    )).scalar()
+
+def _dedupe_predictions(connection):
+    """
+    Keep only the first forecast per user, location, model and target day
+    so the unique index can be built; returns the number of rows deleted
+    """
+    return connection.execute(text(
+        "DELETE FROM predictions WHERE id NOT IN (SELECT MIN(id) FROM predictions "
+        "GROUP BY COALESCE(user_id, 0), COALESCE(location, ''), model_type, prediction_date)"
+    )).rowcount
+
+def _index_exists(connection, index):
+    if connection.dialect.name == 'sqlite':
+        # SQLite reflection skips expression indexes, so look the name up directly
+        return connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+        ), {'name': index.name}).first() is not None
+    existing = inspect(connection).get_indexes(index.table.name)
+    return any(entry['name'] == index.name for entry in existing)
+
+def _missing_columns(connection, model):
+    existing = {column['name'] for column in inspect(connection).get_columns(model.__tablename__)}
+    return [column for column in model.__table__.columns if column.name not in existing]
+
+def _add_missing_columns(connection, model):
+    """
+    ALTER TABLE ... ADD COLUMN for nullable columns added after the table was created
+    """
+    for column in _missing_columns(connection, model):
+        if column.nullable:
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(
+                f"ALTER TABLE {model.__tablename__} ADD COLUMN {column.name} {column_type}"
+            ))
+
+def pending_changes(engine):
+    """
+    Columns and indexes upgrade() would add, without changing anything
+    """
+    pending = []
+    with engine.connect() as connection:
+        for model in (Prediction,) + _LOCATION_DATE_MODELS:
+            if not inspect(connection).has_table(model.__tablename__):
+                continue
+            pending += [f"{model.__tablename__}.{column.name}" for column in _missing_columns(connection, model)]
+            pending += [index.name for index in model.__table__.indexes if not _index_exists(connection, index)]
+    return pending
+
+def upgrade(engine):
+    """
+    Bring an existing database up to the current columns and indexes
+
+    A deploy step (python -m database.migrations), run once before the new
+    code serves traffic, not on every app start: it deletes duplicate rows
+    and builds indexes, which concurrent workers must not race on. Safe to
+    run repeatedly. Returns what it did, including rows without a location
+    that share a date, which are reported rather than deleted.
+    """
+    report = {'deduplicated': {}, 'null_location_duplicates': {}}
+    with engine.begin() as connection:
+        _add_missing_columns(connection, Prediction)
+        for model in _LOCATION_DATE_MODELS:
+            table = model.__tablename__
+            for index in model.__table__.indexes:
+                if _index_exists(connection, index):
+                    continue
+                if index.unique:
+                    report['deduplicated'][table] = _dedupe_location_date(connection, table)
+                index.create(connection)
+            report['null_location_duplicates'][table] = _null_location_duplicates(connection, table)
+        for index in Prediction.__table__.indexes:
+            if _index_exists(connection, index):
+                continue
+            if index.unique:
+                report['deduplicated'][Prediction.__tablename__] = _dedupe_predictions(connection)
+            index.create(connection)
+    return report
+
+if __name__ == '__main__':
+    from flask import Flask
+    from config import Config
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        report = upgrade(db.engine)
+    for table, deleted in report['deduplicated'].items():
+        print(f"{table}: removed {deleted} duplicate rows before adding the unique index")
+    for table, count in report['null_location_duplicates'].items():
+        if count:
+            print(f"{table}: {count} rows without a location share a date; they were kept. "
+                  f"Set their location (e.g. to 'default') and rerun to deduplicate them.")
+    print("Database columns and indexes are up to date")
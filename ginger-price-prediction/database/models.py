@@ -29,10 +29,14 @@ class User(UserMixin, db.Model):
 
 class Prediction(db.Model):
     __tablename__ = 'predictions'
+    __table_args__ = (
+        db.Index('ix_predictions_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     model_type = db.Column(db.String(20), nullable=False)  # 'lstm', 'rnn', 'gru'
+    location = db.Column(db.String(100))  # Market the forecast is for (None = default)
     current_price = db.Column(db.Float, nullable=False)
     predicted_price = db.Column(db.Float, nullable=False)
     prediction_date = db.Column(db.Date, nullable=False)
@@ -44,8 +48,19 @@ class Prediction(db.Model):
     def __repr__(self):
         return f'<Prediction {self.id} - {self.model_type}>'
 
+# One forecast per user, market, model and target day; NULL user/location are
+# coalesced so anonymous and default-market rows collide too. Also the
+# conflict target that makes recording a repeated forecast a no-op.
+db.Index('ix_predictions_user_location_model_date',
+         db.func.coalesce(Prediction.user_id, 0), db.func.coalesce(Prediction.location, ''),
+         Prediction.model_type, Prediction.prediction_date, unique=True)
+
 class GingerPrice(db.Model):
     __tablename__ = 'ginger_prices'
+    __table_args__ = (
+        # One price per market per day; also the upsert conflict target for ingest
+        db.Index('ix_ginger_prices_location_date', 'location', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
@@ -59,6 +74,9 @@ class GingerPrice(db.Model):
 
 class WeatherData(db.Model):
     __tablename__ = 'weather_data'
+    __table_args__ = (
+        db.Index('ix_weather_data_location_date', 'location', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
@@ -77,4 +95,12 @@ def init_db(app):
     """
     with app.app_context():
         db.init_app(app)
-        db.create_all()
\ No newline at end of file
+        db.create_all()
+        
+        # create_all doesn't touch tables that already exist; altering them is
+        # a deploy step (python -m database.migrations), not done per worker
+        from database.migrations import pending_changes
+        pending = pending_changes(db.engine)
+        if pending:
+            print(f"Database schema is out of date ({', '.join(pending)}); "
+                  f"run python -m database.migrations")
\ No newline at end of file
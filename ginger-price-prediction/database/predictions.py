@@ -0,0 +1,201 @@
+import base64
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from config import Config
+from database.models import db, Prediction, GingerPrice
+from database.ingest import DEFAULT_LOCATION
+
+def _insert_ignoring_duplicates():
+    """
+    INSERT that skips rows already recorded for the same user, location,
+    model and target day (ix_predictions_user_location_model_date)
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(Prediction.__table__).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(Prediction.__table__).on_conflict_do_nothing()
+    # No portable upsert; a repeated forecast fails the insert and is logged
+    return Prediction.__table__.insert()
+
+def record_predictions(entries, user_id=None):
+    """
+    Persist forecasts in one bulk insert
+
+    entries is a list of (prediction result, model_type, location) as
+    returned by predict_ginger_price; one row is written per forecast day
+    for the requesting user, however the forecast was produced. Days this
+    user already has a forecast for (same location and model) are skipped
+    by the insert, so asking again never duplicates history.
+    Failures are logged and never break the request that made the forecast.
+    """
+    now = datetime.utcnow()
+    rows = {}
+    for result, model_type, location in entries:
+        for point in result['predictions']:
+            prediction_date = datetime.strptime(point['date'], '%Y-%m-%d').date()
+            rows.setdefault((model_type, location, prediction_date), {
+                'user_id': user_id,
+                'model_type': model_type,
+                'location': location,
+                'current_price': result['current_price'],
+                'predicted_price': point['predicted_price'],
+                'prediction_date': prediction_date,
+                'created_at': now
+            })
+    if not rows:
+        return 0
+
+    try:
+        db.session.execute(_insert_ignoring_duplicates(), list(rows.values()))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error recording predictions: {str(e)}")
+        return 0
+    return len(rows)
+
+def encode_cursor(created_at, prediction_id):
+    raw = f"{created_at.isoformat()}|{prediction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    created_at, prediction_id = raw.split('|')
+    return datetime.fromisoformat(created_at), int(prediction_id)
+
+def _status(accuracy):
+    if accuracy is None:
+        return 'Pending'
+    if accuracy >= 98:
+        return 'Accurate'
+    if accuracy >= 95:
+        return 'Moderate'
+    return 'Inaccurate'
+
+def get_prediction_page(user_id=None, cursor=None, limit=20):
+    """
+    One page of prediction history, newest first
+
+    Keyset pagination on (created_at, id): each page seeks straight to the
+    cursor through the (user_id, created_at) index instead of skipping
+    OFFSET rows, so deep pages cost the same as the first. Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = db.session.query(
+        Prediction.id, Prediction.created_at, Prediction.prediction_date, Prediction.model_type,
+        Prediction.location, Prediction.predicted_price, Prediction.actual_price, Prediction.accuracy
+    ).filter(Prediction.user_id == user_id if user_id is not None else Prediction.user_id.is_(None))
+
+    if cursor:
+        created_at, prediction_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Prediction.created_at < created_at,
+            and_(Prediction.created_at == created_at, Prediction.id < prediction_id)
+        ))
+
+    rows = query.order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    history = [
+        {
+            'id': row.id,
+            'date': row.prediction_date.strftime('%Y-%m-%d'),
+            'created_at': row.created_at.isoformat(),
+            'model_used': row.model_type.upper(),
+            'location': row.location,
+            'predicted_price': row.predicted_price,
+            'actual_price': row.actual_price,
+            'accuracy': row.accuracy,
+            'status': _status(row.accuracy)
+        }
+        for row in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return history, next_cursor
+
+def backfill_accuracy():
+    """
+    Fill actual_price and accuracy for every prediction whose date now has
+    a recorded price, as two set-based UPDATEs in one transaction
+    """
+    actual = select(GingerPrice.price).where(
+        GingerPrice.date == Prediction.prediction_date,
+        GingerPrice.location == func.coalesce(Prediction.location, DEFAULT_LOCATION)
+    ).limit(1).scalar_subquery()
+
+    try:
+        filled = db.session.execute(
+            update(Prediction)
+            .where(Prediction.actual_price.is_(None), actual.is_not(None))
+            .values(actual_price=actual)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.execute(
+            update(Prediction)
+            .where(Prediction.accuracy.is_(None), Prediction.actual_price.is_not(None),
+                   Prediction.actual_price != 0)
+            .values(accuracy=100.0 - func.abs(Prediction.predicted_price - Prediction.actual_price)
+                    * 100.0 / Prediction.actual_price)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return filled
+
+# Process that owns the running backfill thread, so a forked worker starts its own
+_backfill = {'pid': None}
+_backfill_lock = threading.Lock()
+
+def _run_backfill(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                backfill_accuracy()
+            except Exception as e:
+                print(f"Error backfilling prediction accuracy: {str(e)}")
+            finally:
+                db.session.remove()
+
+def start_accuracy_backfill(app, interval=None):
+    """
+    Run backfill_accuracy every `interval` seconds in a daemon thread
+
+    The thread is started by the first request each process serves, not at
+    import: threads don't survive fork, so under gunicorn --preload one
+    started in the master would never run in the workers. The UPDATEs are
+    idempotent, so it's harmless that every worker runs it. Without a web
+    server, run `python -m database.predictions` from cron instead.
+    """
+    interval = interval or Config.ACCURACY_BACKFILL_INTERVAL
+
+    @app.before_request
+    def ensure_accuracy_backfill():
+        if _backfill['pid'] == os.getpid():
+            return
+        with _backfill_lock:
+            if _backfill['pid'] == os.getpid():
+                return
+            _backfill['pid'] = os.getpid()
+            threading.Thread(target=_run_backfill, args=(app, interval),
+                             name='accuracy-backfill', daemon=True).start()
+
+    return app
+
+if __name__ == '__main__':
+    from flask import Flask
+    from database.models import init_db
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    init_db(app)
+    with app.app_context():
+        print(f"Filled actual prices for {backfill_accuracy()} predictions")
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+import numpy as np
+from datetime import datetime
+
+ARTIFACT_FORMAT_VERSION = 1
+
+# Array-valued entries of a model dict and where they live in the .npz
+_ARRAY_KEYS = ('W_out', 'last_sequence', 'W_exog', 'exog_mean', 'exog_std', 'exog_last')
+_WEIGHT_PREFIX = 'weights.'
+
+# Scalar metadata copied into the JSON manifest
+_META_KEYS = ('model_type', 'location', 'sequence_length', 'hidden_size', 'ridge', 'seed',
+              'b_out', 'scaler_min', 'scaler_scale', 'data_min', 'data_max', 'accuracy',
+              'exog_columns')
+
+def data_fingerprint(values):
+    """
+    Stable fingerprint of a training series (length + SHA-256 of the values)
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    digest = hashlib.sha256(values.tobytes()).hexdigest()[:16]
+    return f"{len(values)}-{digest}"
+
+def extend_fingerprint(fingerprint, values):
+    """
+    Fingerprint of a training series after appending values to it
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    sha = hashlib.sha256((fingerprint or '').encode())
+    sha.update(values.tobytes())
+    length = int(fingerprint.split('-')[0]) if fingerprint else 0
+    return f"{length + len(values)}-{sha.hexdigest()[:16]}"
+
+def _file_checksum(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def save_artifact(model_info, directory, name, fingerprint=None):
+    """
+    Write a model as <name>-<version>.npz plus a <name>.json manifest
+
+    The .npz is stored uncompressed so its arrays can be memory-mapped in
+    place. The manifest is renamed into place last and is the commit point:
+    readers always see either the old or the new version, never a mix.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+    npz_name = f"{name}-{version}.npz"
+    npz_path = os.path.join(directory, npz_name)
+
+    arrays = {key: np.ascontiguousarray(model_info[key]) for key in _ARRAY_KEYS if model_info.get(key) is not None}
+    for key, value in model_info['weights'].items():
+        arrays[_WEIGHT_PREFIX + key] = np.ascontiguousarray(value)
+
+    tmp_npz = f"{npz_path}.tmp-{os.getpid()}"
+    with open(tmp_npz, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_npz, npz_path)
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'name': name,
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'weights_file': npz_name,
+        'checksum': _file_checksum(npz_path),
+        'training_data_fingerprint': fingerprint,
+        'arrays': {key: {'shape': list(a.shape), 'dtype': str(a.dtype)} for key, a in arrays.items()},
+        'metadata': {key: model_info.get(key) for key in _META_KEYS}
+    }
+    return _commit_manifest(directory, name, manifest)
+
+def _commit_manifest(directory, name, manifest):
+    """
+    Atomically replace <name>.json with manifest
+
+    The weights file of the version being replaced is kept until the next
+    commit, so a reader that read the old manifest just before the swap can
+    still open and verify it; only the one before that is deleted.
+    Unlinking is safe for workers that still map a deleted file.
+    """
+    manifest_path = os.path.join(directory, f"{name}.json")
+    previous = read_manifest(manifest_path) or {}
+    keep = {manifest['weights_file']}
+    if previous.get('weights_file') and previous['weights_file'] != manifest['weights_file']:
+        manifest['previous_weights_file'] = previous['weights_file']
+        keep.add(previous['weights_file'])
+
+    tmp_manifest = f"{manifest_path}.tmp-{os.getpid()}"
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+
+    stale = previous.get('previous_weights_file')
+    if stale and stale not in keep:
+        try:
+            os.remove(os.path.join(directory, stale))
+        except OSError:
+            pass
+
+    return manifest
+
+def promote_artifact(directory, source_name, target_name):
+    """
+    Publish an already saved artifact under another name without retraining
+
+    Its weights file is hard-linked (copied where links aren't supported)
+    as <target_name>-<version>.npz and the target manifest is committed
+    atomically, as save_artifact would.
+    """
+    source = read_manifest(os.path.join(directory, f"{source_name}.json"))
+    if source is None:
+        raise ValueError(f"No artifact named {source_name}")
+
+    npz_name = f"{target_name}-{source['version']}.npz"
+    npz_path = os.path.join(directory, npz_name)
+    tmp_npz = f"{npz_path}.tmp-{os.getpid()}"
+    try:
+        os.link(os.path.join(directory, source['weights_file']), tmp_npz)
+    except OSError:
+        shutil.copyfile(os.path.join(directory, source['weights_file']), tmp_npz)
+    os.replace(tmp_npz, npz_path)
+
+    manifest = dict(source, name=target_name, weights_file=npz_name, promoted_from=source_name)
+    manifest.pop('previous_weights_file', None)
+    return _commit_manifest(directory, target_name, manifest)
+
+def read_manifest(manifest_path):
+    """
+    Read an artifact manifest, or None if it doesn't exist
+    """
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _mmap_npz(npz_path):
+    """
+    Memory-map every member of an uncompressed .npz without copying it
+
+    np.load ignores mmap_mode for .npz archives, so locate each stored .npy
+    member inside the zip and map its data section directly.
+    """
+    arrays = {}
+    with zipfile.ZipFile(npz_path) as archive, open(npz_path, 'rb') as raw:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+            # Local file header: 30 fixed bytes + name + extra field
+            raw.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(raw.read(4), dtype='<u2')
+            member_start = info.header_offset + 30 + int(name_len) + int(extra_len)
+
+            raw.seek(member_start)
+            major, _ = np.lib.format.read_magic(raw)
+            if major == 1:
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(raw)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(raw)
+            arrays[info.filename[:-len('.npy')]] = np.memmap(
+                npz_path, dtype=dtype, mode='r', offset=raw.tell(), shape=shape,
+                order='F' if fortran else 'C'
+            )
+    return arrays
+
+def load_artifact(manifest_path, mmap=True, verify=True):
+    """
+    Load a model artifact into the dict shape used by models.inference
+
+    With mmap the weight arrays are shared page-cache mappings, so every
+    gunicorn worker serving the same version uses one copy in memory.
+    """
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        return None
+    try:
+        return _load_version(manifest_path, manifest, mmap, verify)
+    except (OSError, ValueError):
+        # A save may have replaced the manifest since it was read: retry once
+        # with the current one
+        latest = read_manifest(manifest_path)
+        if latest is None or latest.get('version') == manifest.get('version'):
+            raise
+        return _load_version(manifest_path, latest, mmap, verify)
+
+def _load_version(manifest_path, manifest, mmap, verify):
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+    npz_path = os.path.join(os.path.dirname(manifest_path), manifest['weights_file'])
+    if verify and _file_checksum(npz_path) != manifest['checksum']:
+        raise ValueError(f"Checksum mismatch for {npz_path}")
+
+    if mmap:
+        arrays = _mmap_npz(npz_path)
+    else:
+        with np.load(npz_path) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+
+    model = dict(manifest['metadata'])
+    model['weights'] = {}
+    for key, value in arrays.items():
+        if key.startswith(_WEIGHT_PREFIX):
+            model['weights'][key[len(_WEIGHT_PREFIX):]] = value
+        else:
+            model[key] = value
+    model['version'] = manifest['version']
+    model['training_data_fingerprint'] = manifest.get('training_data_fingerprint')
+    return model
+
+def measure_cold_start(manifest_path, pickle_path=None, repeats=5):
+    """
+    Time a cold load of the artifact against the legacy joblib pickle
+
+    If no pickle exists one is written from the artifact to a temp file so
+    the two formats are compared on identical content.
+    """
+    import joblib
+    import tempfile
+
+    def best_of(fn):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    model = load_artifact(manifest_path, mmap=False)
+    cleanup = None
+    if pickle_path is None or not os.path.exists(pickle_path):
+        fd, pickle_path = tempfile.mkstemp(suffix='.pkl')
+        os.close(fd)
+        joblib.dump(model, pickle_path)
+        cleanup = pickle_path
+
+    try:
+        return {
+            'joblib_ms': best_of(lambda: joblib.load(pickle_path)),
+            'npz_mmap_ms': best_of(lambda: load_artifact(manifest_path, mmap=True, verify=False)),
+            'npz_mmap_verified_ms': best_of(lambda: load_artifact(manifest_path, mmap=True)),
+            'npz_copy_ms': best_of(lambda: load_artifact(manifest_path, mmap=False, verify=False))
+        }
+    finally:
+        if cleanup:
+            os.remove(cleanup)
+
+if __name__ == '__main__':
+    import sys
+    from config import Config
+
+    for model_type in sys.argv[1:] or ['lstm', 'gru', 'rnn']:
+        manifest_path = os.path.join(Config.MODEL_PATH, f'{model_type}_model.json')
+        if read_manifest(manifest_path) is None:
+            print(f"{model_type}: no artifact found")
+            continue
+        legacy = os.path.join(Config.MODEL_PATH, f'{model_type}_model.pkl')
+        timings = measure_cold_start(manifest_path, legacy)
+        print(f"{model_type}: " + ', '.join(f"{k}={v:.2f}" for k, v in timings.items()))
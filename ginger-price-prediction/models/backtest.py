@@ -0,0 +1,115 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from numpy.lib.stride_tricks import sliding_window_view
+from config import Config
+from models.inference import MODEL_TYPES, forecast
+from models.train_model import fit_model
+from models.training_pipeline import prepare_series
+
+def forecast_error_metrics(actual, predicted):
+    """
+    MAE/RMSE/MAPE per horizon step for (origins, horizon) arrays in one pass
+    """
+    actual = np.asarray(actual, dtype=np.float64)
+    errors = np.asarray(predicted, dtype=np.float64) - actual
+    abs_errors = np.abs(errors)
+    return {
+        'mae': abs_errors.mean(axis=0),
+        'rmse': np.sqrt((errors ** 2).mean(axis=0)),
+        'mape': (abs_errors / np.abs(actual)).mean(axis=0) * 100
+    }
+
+def walk_forward_backtest(prices, model_type='lstm', horizon=30, n_origins=300,
+                          train_fraction=0.6, workers=None, **params):
+    """
+    Score a model over many rolling forecast origins
+
+    The model is fitted on the history before the first origin only, so
+    every scored forecast is out of sample. All origin windows are gathered
+    with one strided view and forecast as batches, split across threads
+    (NumPy releases the GIL in the matrix products). Returns per-horizon
+    metric arrays plus the number of origins used.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    sequence_length = params.get('sequence_length', 60)
+
+    first_origin = max(int(len(prices) * train_fraction), sequence_length + 1)
+    last_origin = len(prices) - horizon
+    if last_origin < first_origin:
+        raise ValueError(f"Not enough history to backtest a {horizon}-day horizon")
+
+    n_origins = min(n_origins, last_origin - first_origin + 1)
+    origins = np.unique(np.linspace(first_origin, last_origin, n_origins).astype(int))
+
+    model = fit_model(prices[:first_origin], model_type, **params)
+
+    # Window ending just before origin t starts at t - L; actuals are prices[t:t + horizon]
+    windows = sliding_window_view(prices, sequence_length)[origins - sequence_length]
+    actual = sliding_window_view(prices, horizon)[origins]
+
+    workers = workers or min(os.cpu_count() or 1, 8)
+    chunks = [chunk for chunk in np.array_split(np.arange(len(origins)), workers) if len(chunk)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        predicted = np.vstack(list(pool.map(lambda idx: forecast(model, windows[idx], horizon), chunks)))
+
+    metrics = forecast_error_metrics(actual, predicted)
+    metrics['origins'] = len(origins)
+    return metrics
+
+def run_backtests(model_types=MODEL_TYPES, locations=None, horizon=30, n_origins=300, **params):
+    """
+    Backtest every model on every market and return one row per
+    (model_type, location, horizon step)
+    """
+    computed_at = datetime.utcnow().isoformat()
+    frames = []
+    for location, prices in prepare_series(locations).items():
+        for model_type in model_types:
+            try:
+                metrics = walk_forward_backtest(prices, model_type, horizon, n_origins, **params)
+            except Exception as e:
+                print(f"Error backtesting {model_type.upper()} for {location}: {str(e)}")
+                continue
+            frames.append(pd.DataFrame({
+                'model_type': model_type,
+                'location': location if location is not None else '',
+                'horizon': np.arange(1, horizon + 1),
+                'origins': metrics['origins'],
+                'mae': metrics['mae'],
+                'rmse': metrics['rmse'],
+                'mape': metrics['mape'],
+                'computed_at': computed_at
+            }))
+    if not frames:
+        return pd.DataFrame(columns=['model_type', 'location', 'horizon', 'origins',
+                                     'mae', 'rmse', 'mape', 'computed_at'])
+    return pd.concat(frames, ignore_index=True)
+
+def save_backtest_results(results, path=None):
+    """
+    Persist backtest rows for the analysis pages (write-then-rename)
+    """
+    path = path or Config.BACKTEST_RESULTS_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    results.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the price models')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_TYPES), choices=MODEL_TYPES)
+    parser.add_argument('--locations', nargs='+', default=None)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--origins', type=int, default=300)
+    args = parser.parse_args()
+
+    results = run_backtests(args.models, args.locations, args.horizon, args.origins)
+    path = save_backtest_results(results)
+    summary = results.groupby('model_type')[['mae', 'rmse', 'mape']].mean()
+    print(summary.to_string())
+    print(f"Saved {len(results)} rows to {path}")
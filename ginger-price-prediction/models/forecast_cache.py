@@ -0,0 +1,131 @@
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+
+class ForecastCache:
+    """
+    In-process cache of recent forecasts
+
+    Keys identify everything a forecast depends on (model type, artifact
+    version and a fingerprint of the input window), so a stale result is
+    never served. Each entry holds the longest horizon computed so far and
+    shorter requests are answered by slicing it. Entries expire after a TTL
+    and the least recently used are evicted beyond max_entries. Concurrent
+    misses on one key compute it once (get_or_compute).
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, min_horizon=30):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._min_horizon = min_horizon
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'extensions': 0, 'expirations': 0,
+                      'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, horizon):
+        """
+        Return the first `horizon` cached values for key, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['created'] > self._ttl:
+                del self._entries[key]
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is not None and len(entry['values']) >= horizon:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry['values'][:horizon]
+            if entry is not None:
+                self.stats['extensions'] += 1
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, values):
+        """
+        Store a forecast unless a longer one is already cached for key
+        """
+        values = np.array(values, dtype=np.float64)
+        values.setflags(write=False)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or len(current['values']) < len(values):
+                self._entries[key] = {'values': values, 'created': time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return values
+
+    def compute_horizon(self, horizon):
+        """
+        Horizon to actually compute so later short requests become slices
+        """
+        return max(horizon, self._min_horizon)
+
+    def get_or_compute(self, key, horizon, compute):
+        """
+        Return the first `horizon` forecast values for key, calling
+        compute(horizon) only when no cached forecast is long enough
+
+        Concurrent misses for a key share one computation; a caller that
+        needs a longer horizon than the one in flight computes its own.
+        """
+        values = self.get(key, horizon)
+        if values is not None:
+            return values
+        
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None or flight['horizon'] < horizon
+            if leader:
+                flight = {'done': threading.Event(), 'horizon': self.compute_horizon(horizon)}
+                self._inflight[key] = flight
+        
+        if not leader:
+            flight['done'].wait()
+            if 'values' in flight:
+                return flight['values'][:horizon]
+            raise flight['error']
+        
+        try:
+            flight['values'] = self.put(key, compute(flight['horizon']))
+            return flight['values'][:horizon]
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight['done'].set()
+
+    def invalidate(self, predicate=None):
+        """
+        Drop every entry, or only those whose key matches predicate
+        """
+        with self._lock:
+            if predicate is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if predicate(key)]
+                for key in stale:
+                    del self._entries[key]
+                dropped = len(stale)
+            self.stats['invalidations'] += dropped
+
+    def get_stats(self):
+        """
+        Counters plus current size and hit ratio
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,118 @@
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import Config
+from models.artifacts import save_artifact, extend_fingerprint
+from models.inference import encode, forecast, scale, unscale
+from models.train_model import load_model, artifact_name, evaluate_model
+
+def _rescale_model(model, data_min, data_max):
+    """
+    Move a model onto a wider min/max scaler without changing its output
+
+    Inputs and outputs are affine in the scaled space, so the change of
+    scale is folded into the input weights/bias and the readout: the
+    updated model produces exactly the same prices as before.
+    """
+    span = data_max - data_min
+    new_scale = 1.0 / span if span > 0 else 1.0
+    new_min = -data_min * new_scale
+    ratio = new_scale / model['scaler_scale']
+    old_min = model['scaler_min']
+
+    # x_old = (x_new - new_min) / ratio + old_min
+    weights = {key: np.array(value) for key, value in model['weights'].items()}
+    weights['b'] = weights['b'] + (old_min - new_min / ratio) * weights['W_x'][0]
+    weights['W_x'] = weights['W_x'] / ratio
+
+    model['weights'] = weights
+    model['W_out'] = np.array(model['W_out']) * ratio
+    if model.get('W_exog') is not None:
+        model['W_exog'] = np.array(model['W_exog']) * ratio
+    model['b_out'] = (model['b_out'] - old_min) * ratio + new_min
+    model['scaler_scale'] = new_scale
+    model['scaler_min'] = new_min
+    model['data_min'] = data_min
+    model['data_max'] = data_max
+
+def _fine_tune_readout(model, windows, targets, prior_strength):
+    """
+    Refit the readout on the newest windows, shrunk toward the current
+    readout so a handful of days can't overwrite what the model learned
+    """
+    H = encode(model['model_type'], model['weights'], scale(model, windows))[0]
+    targets = scale(model, targets)
+    if model.get('W_exog') is not None:
+        # The weather term stays fixed; fit the readout to what remains
+        targets = targets - np.asarray(model['exog_last']) @ model['W_exog']
+    A = np.hstack([H, np.ones((len(H), 1))])
+    prior = np.append(np.asarray(model['W_out']), model['b_out'])
+    penalty = prior_strength * np.eye(A.shape[1])
+    coef = np.linalg.solve(A.T @ A + penalty, A.T @ targets + penalty @ prior)
+    model['W_out'], model['b_out'] = coef[:-1], float(coef[-1])
+
+def update_model(model_type, new_prices, location=None, fine_tune=False,
+                 fine_tune_windows=256, prior_strength=1.0):
+    """
+    Fold newly observed daily prices into a saved model
+
+    Scores the current model's one-step forecasts on the new prices, widens
+    the scaler's running min/max, rolls last_sequence forward, optionally
+    fine-tunes the readout on the newest windows and saves a new artifact
+    version. needs_retrain is set when the new prices drift too far from
+    what the model was trained on for an incremental update to be trusted.
+    """
+    started = time.perf_counter()
+    model = load_model(model_type, location)
+    if model is None or 'weights' not in model:
+        raise ValueError(f"No saved {model_type.upper()} model to update")
+    if model.get('location') != location:
+        # last_sequence would belong to another market
+        raise ValueError(f"No saved {model_type.upper()} model for {location}; train one first")
+
+    model = dict(model)  # never mutate the registry's shared copy
+    new_prices = np.asarray(new_prices, dtype=np.float64).ravel()
+    if len(new_prices) == 0:
+        raise ValueError("No new prices to apply")
+
+    sequence_length = model['sequence_length']
+    history = unscale(model, np.asarray(model['last_sequence']).ravel())
+    series = np.concatenate([history, new_prices])
+
+    # One-step forecasts for each new day from the window just before it
+    windows = sliding_window_view(series, sequence_length)[:len(new_prices)]
+    predicted = forecast(model, windows, 1)[:, 0]
+    recent_mape = float(evaluate_model(new_prices, predicted)['mape'])
+
+    old_min, old_max = model['data_min'], model['data_max']
+    data_min = min(old_min, float(new_prices.min()))
+    data_max = max(old_max, float(new_prices.max()))
+    old_span = old_max - old_min
+    range_growth = ((data_max - data_min) / old_span - 1.0) if old_span > 0 else 0.0
+    if data_min != old_min or data_max != old_max:
+        _rescale_model(model, data_min, data_max)
+
+    if fine_tune:
+        n = min(fine_tune_windows, len(new_prices))
+        _fine_tune_readout(model, windows[-n:], new_prices[-n:], prior_strength)
+
+    model['last_sequence'] = scale(model, series[-sequence_length:]).reshape(-1, 1)
+
+    baseline_mape = 100 - model['accuracy'] if model.get('accuracy') is not None else None
+    mape_limit = max(Config.DRIFT_MAPE_THRESHOLD, 2 * baseline_mape if baseline_mape else 0)
+    needs_retrain = recent_mape > mape_limit or range_growth > Config.DRIFT_RANGE_THRESHOLD
+
+    manifest = save_artifact(model, Config.MODEL_PATH, artifact_name(model_type, location),
+                             fingerprint=extend_fingerprint(model.get('training_data_fingerprint'), new_prices))
+
+    return {
+        'model_type': model_type,
+        'location': location,
+        'version': manifest['version'],
+        'observations': len(new_prices),
+        'recent_mape': recent_mape,
+        'range_growth': range_growth,
+        'fine_tuned': fine_tune,
+        'needs_retrain': needs_retrain,
+        'elapsed': time.perf_counter() - started
+    }
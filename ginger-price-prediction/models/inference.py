@@ -0,0 +1,160 @@
+"""
+NumPy-only inference engine for the recurrent price models (LSTM, GRU, RNN)
+
+Every function works on a whole batch of series at once: inputs are shaped
+(batch, time steps, features) and the recurrence loops over time only, so
+forecasting many markets and horizons costs one pass of matrix products.
+"""
+
+import numpy as np
+from utils.metrics import timed_stage
+
+MODEL_TYPES = ('lstm', 'gru', 'rnn')
+
+# Number of stacked gate blocks in the input/recurrent matrices per cell type
+_GATES = {'lstm': 4, 'gru': 3, 'rnn': 1}
+
+def init_recurrent_weights(model_type, hidden_size=32, input_size=1,
+                           spectral_radius=0.9, input_scale=0.5, seed=42):
+    """
+    Initialize the recurrent cell weights for a model type
+
+    The recurrent matrix is rescaled to the given spectral radius so the
+    state stays stable when the cell is run far past the training window.
+    """
+    if model_type not in _GATES:
+        raise ValueError(f"Unknown model type: {model_type}")
+
+    rng = np.random.default_rng(seed)
+    gates = _GATES[model_type]
+
+    W_x = rng.uniform(-input_scale, input_scale, size=(input_size, gates * hidden_size))
+    W_h = rng.normal(0, 1, size=(hidden_size, gates * hidden_size))
+    for g in range(gates):
+        block = W_h[:, g * hidden_size:(g + 1) * hidden_size]
+        radius = np.max(np.abs(np.linalg.eigvals(block)))
+        block *= spectral_radius / radius
+    b = np.zeros(gates * hidden_size)
+    if model_type == 'lstm':
+        # Bias the forget gate open so long windows are remembered
+        b[hidden_size:2 * hidden_size] = 1.0
+
+    return {
+        'W_x': W_x.astype(np.float64),
+        'W_h': W_h.astype(np.float64),
+        'b': b
+    }
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+def _lstm_step(weights, x_t, state):
+    h, c = state
+    H = h.shape[1]
+    z = x_t @ weights['W_x'] + h @ weights['W_h'] + weights['b']
+    i = _sigmoid(z[:, :H])
+    f = _sigmoid(z[:, H:2 * H])
+    g = np.tanh(z[:, 2 * H:3 * H])
+    o = _sigmoid(z[:, 3 * H:])
+    c = f * c + i * g
+    h = o * np.tanh(c)
+    return h, (h, c)
+
+def _gru_step(weights, x_t, state):
+    h = state
+    H = h.shape[1]
+    zx = x_t @ weights['W_x'] + weights['b']
+    W_h = weights['W_h']
+    zu = _sigmoid(zx[:, :H] + h @ W_h[:, :H])
+    r = _sigmoid(zx[:, H:2 * H] + h @ W_h[:, H:2 * H])
+    n = np.tanh(zx[:, 2 * H:] + (r * h) @ W_h[:, 2 * H:])
+    h = (1.0 - zu) * n + zu * h
+    return h, h
+
+def _rnn_step(weights, x_t, state):
+    h = np.tanh(x_t @ weights['W_x'] + state @ weights['W_h'] + weights['b'])
+    return h, h
+
+_STEPS = {'lstm': _lstm_step, 'gru': _gru_step, 'rnn': _rnn_step}
+
+def _initial_state(model_type, batch_size, hidden_size):
+    h = np.zeros((batch_size, hidden_size))
+    if model_type == 'lstm':
+        return (h, np.zeros_like(h))
+    return h
+
+def encode(model_type, weights, X, state=None):
+    """
+    Run the cell over a batch of windows shaped (batch, time steps, features)
+
+    Returns the last hidden output (batch, hidden) and the carried state.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 2:
+        X = X[..., np.newaxis]
+    step = _STEPS[model_type]
+    hidden_size = weights['W_h'].shape[0]
+    if state is None:
+        state = _initial_state(model_type, X.shape[0], hidden_size)
+
+    h = state[0] if model_type == 'lstm' else state
+    for t in range(X.shape[1]):
+        h, state = step(weights, X[:, t, :], state)
+    return h, state
+
+def readout(model, h):
+    """
+    Map hidden outputs to the next scaled value
+    """
+    out = h @ model['W_out'] + model['b_out']
+    if model.get('W_exog') is not None:
+        # Weather features are held at their last observed value
+        out = out + np.asarray(model['exog_last']) @ model['W_exog']
+    return out
+
+def scale(model, values):
+    return np.asarray(values, dtype=np.float64) * model['scaler_scale'] + model['scaler_min']
+
+def unscale(model, values):
+    return (np.asarray(values, dtype=np.float64) - model['scaler_min']) / model['scaler_scale']
+
+def iter_forecast(model, windows, horizon, chunk_size=256):
+    """
+    Recursive multi-step forecast yielded in chunks of at most chunk_size
+    steps, each an array of raw prices shaped (batch, steps)
+
+    Only the recurrent state and one chunk are held at a time, so memory
+    stays flat however long the horizon is.
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    if windows.ndim == 1:
+        windows = windows[np.newaxis, :]
+
+    model_type = model['model_type']
+    weights = model['weights']
+    step = _STEPS[model_type]
+
+    h, state = encode(model_type, weights, scale(model, windows))
+    for start in range(0, horizon, chunk_size):
+        out = np.empty((windows.shape[0], min(chunk_size, horizon - start)))
+        for k in range(out.shape[1]):
+            y = readout(model, h)
+            out[:, k] = y
+            h, state = step(weights, y[:, np.newaxis], state)
+        yield unscale(model, out)
+
+@timed_stage('inference')
+def forecast(model, windows, horizon):
+    """
+    Recursive multi-step forecast for a batch of series
+
+    windows is (batch, sequence_length) of raw prices (a single 1-D window
+    is accepted too). The cell consumes each window once, then feeds every
+    prediction back in as the next input while carrying the recurrent state,
+    so a horizon of H costs H extra steps instead of H full window passes.
+    Returns an array of raw prices shaped (batch, horizon).
+    """
+    chunks = list(iter_forecast(model, windows, horizon, chunk_size=max(horizon, 1)))
+    if not chunks:
+        return np.empty((np.atleast_2d(windows).shape[0], 0))
+    return chunks[0]
@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime
+
+def _artifact_version(path):
+    """
+    Version of an artifact on disk as (mtime_ns, size), or None if missing
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def estimate_nbytes(obj):
+    """
+    Rough in-memory size of a loaded model (arrays dominate)
+    """
+    if isinstance(obj, np.ndarray):
+        # Memory-mapped arrays live in the page cache, not the worker heap
+        return 0 if isinstance(obj, np.memmap) or isinstance(obj.base, np.memmap) else obj.nbytes
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+class ModelRegistry:
+    """
+    Per-process cache of loaded model artifacts
+
+    Each artifact is loaded once per worker and kept in an LRU bounded by a
+    memory budget. Every lookup stats the file; when a newer version has been
+    written the new model is loaded and swapped in under the lock, while
+    requests already holding the old object keep using it untouched.
+    """
+
+    def __init__(self, loader, memory_budget=256 * 1024 * 1024):
+        self._loader = loader
+        self._memory_budget = memory_budget
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'swaps': 0, 'evictions': 0}
+
+    def get(self, path):
+        """
+        Return the current model for an artifact path, or None if missing
+        """
+        version = _artifact_version(path)
+        if version is None:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['version'] == version:
+                self._entries.move_to_end(path)
+                entry['hits'] += 1
+                self.stats['hits'] += 1
+                return entry['model']
+
+        # Load outside the lock so other models keep being served meanwhile
+        model = self._loader(path)
+        if model is None:
+            return None
+
+        with self._lock:
+            current = self._entries.get(path)
+            if current is not None and current['version'] == version:
+                # Another thread finished loading the same version first
+                self._entries.move_to_end(path)
+                return current['model']
+            if current is not None:
+                self.stats['swaps'] += 1
+            self.stats['misses'] += 1
+            self._entries[path] = {
+                'model': model,
+                'version': version,
+                'nbytes': estimate_nbytes(model),
+                'loaded_at': datetime.utcnow().isoformat(),
+                'hits': 0
+            }
+            self._entries.move_to_end(path)
+            self._evict()
+        return model
+
+    def _evict(self):
+        total = sum(e['nbytes'] for e in self._entries.values())
+        # Always keep the most recently used model, even if it alone is over budget
+        while total > self._memory_budget and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry['nbytes']
+            self.stats['evictions'] += 1
+
+    def resident(self):
+        """
+        Describe the model versions currently held in memory, oldest first
+        """
+        with self._lock:
+            return [
+                {
+                    'path': path,
+                    'model_type': entry['model'].get('model_type') if isinstance(entry['model'], dict) else None,
+                    'version': self._version_label(entry),
+                    'nbytes': entry['nbytes'],
+                    'loaded_at': entry['loaded_at'],
+                    'hits': entry['hits']
+                }
+                for path, entry in self._entries.items()
+            ]
+
+    @staticmethod
+    def _version_label(entry):
+        model = entry['model']
+        if isinstance(model, dict) and model.get('version'):
+            return model['version']
+        return f"{entry['version'][0]}-{entry['version'][1]}"
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,141 +1,439 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import joblib
 import os
 from config import Config
-from utils.data_loader import load_historical_data
+from utils.metrics import timed, timed_stage, record_error, register_collector, cache_samples
+from models.registry import ModelRegistry
+from models.forecast_cache import ForecastCache
+from models.artifacts import save_artifact, load_artifact, data_fingerprint
+from models.inference import MODEL_TYPES, init_recurrent_weights, encode, unscale, forecast, iter_forecast
+from utils.data_loader import load_historical_data, load_recent_prices, price_series
+from utils.feature_store import get_training_features
+from utils.columnar_store import register_ingest_listener, assign_slugs, location_slug
 
-def create_sequences(data, seq_length):
+def _window_view(data, seq_length):
+    """
+    Strided (samples, seq_length[, features]) view over every window of data
+    """
+    data = np.asarray(data)
+    n_windows = len(data) - seq_length
+    if n_windows <= 0:
+        return np.empty((0, seq_length) + data.shape[1:], dtype=data.dtype)
+    
+    # Windows are read-only views sharing memory with data; the last full
+    # window is dropped because it has no next-step target
+    windows = sliding_window_view(data, seq_length, axis=0)[:n_windows]
+    if data.ndim > 1:
+        # sliding_window_view puts the window axis last: (samples, features, seq)
+        windows = np.moveaxis(windows, -1, 1)
+    return windows
+
+def create_sequences(data, seq_length, target_column=None):
     """
     Create sequences for time series prediction
+    
+    Returns read-only views rather than copies: X has shape
+    (samples, seq_length) for 1-D data or (samples, seq_length, features)
+    for multivariate data, and y holds the value following each window
+    (only target_column of it when given).
     """
-    X, y = [], []
-    for i in range(len(data) - seq_length):
-        X.append(data[i:(i + seq_length)])
-        y.append(data[i + seq_length])
-    return np.array(X), np.array(y)
+    data = np.asarray(data)
+    X = _window_view(data, seq_length)
+    y = data[seq_length:]
+    if target_column is not None and data.ndim > 1:
+        y = y[:, target_column]
+    return X, y
 
-def train_lstm_model(data, sequence_length=60):
+def iter_sequence_batches(data, seq_length, batch_size=1024, target_column=None):
     """
-    Train an LSTM model for ginger price prediction
-    This is a simplified implementation - in a real application, 
-    you would use actual deep learning frameworks like TensorFlow/Keras
+    Yield (X, y) windows in fixed-size chunks without materializing the
+    full 3-D tensor; each chunk is a view into data
+    """
+    X, y = create_sequences(data, seq_length, target_column)
+    for start in range(0, len(X), batch_size):
+        yield X[start:start + batch_size], y[start:start + batch_size]
+
+def _fit_readout(H, y, ridge):
+    """
+    Closed-form ridge regression of targets on hidden outputs (with bias)
+    """
+    A = np.hstack([H, np.ones((len(H), 1))])
+    penalty = ridge * np.eye(A.shape[1])
+    penalty[-1, -1] = 0.0  # don't shrink the bias
+    coef = np.linalg.solve(A.T @ A + penalty, A.T @ y)
+    return coef[:-1], float(coef[-1])
+
+def fit_model(prices, model_type='lstm', sequence_length=60, hidden_size=32,
+              ridge=1e-3, seed=42, exog=None):
+    """
+    Fit a recurrent (LSTM/GRU/RNN) model on a 1-D price series
+    
+    The recurrent cell weights are initialized once and kept fixed; only the
+    dense readout on the final hidden state is fitted, in closed form, so
+    training needs nothing beyond NumPy. The last 10% of windows are held out
+    to measure one-step accuracy before the readout is refitted on all data.
+    
+    exog, when given, is an (n, k) array of features aligned with prices
+    (e.g. weather from utils.feature_store); the readout also sees their
+    standardized values as of each window's last day.
+    """
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    
+    # Prepare the data
+    prices = np.asarray(prices, dtype=np.float64).reshape(-1, 1)
+    
+    # Scale the data
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaled_prices = scaler.fit_transform(prices).flatten()
+    
+    # Create sequences
+    X, y = create_sequences(scaled_prices, sequence_length)
+    if len(X) == 0:
+        raise ValueError(f"Need more than {sequence_length} prices to train")
+    
+    # Encode every window through the recurrent cell in chunks
+    weights = init_recurrent_weights(model_type, hidden_size, seed=seed)
+    H = np.empty((len(X), hidden_size))
+    offset = 0
+    for X_batch, _ in iter_sequence_batches(scaled_prices, sequence_length, batch_size=2048):
+        H[offset:offset + len(X_batch)] = encode(model_type, weights, X_batch)[0]
+        offset += len(X_batch)
+    
+    Z = None
+    if exog is not None:
+        exog = np.asarray(exog, dtype=np.float64).reshape(len(prices), -1)
+        exog_mean = exog.mean(axis=0)
+        exog_std = exog.std(axis=0)
+        exog_std[exog_std == 0] = 1.0
+        Z = (exog - exog_mean) / exog_std
+        H = np.hstack([H, Z[sequence_length - 1:-1]])
+    
+    model_info = {
+        'scaler': scaler,
+        'scaler_min': float(scaler.min_[0]),
+        'scaler_scale': float(scaler.scale_[0]),
+        'data_min': float(scaler.data_min_[0]),
+        'data_max': float(scaler.data_max_[0]),
+        'sequence_length': sequence_length,
+        'hidden_size': hidden_size,
+        'ridge': ridge,
+        'seed': seed,
+        'last_sequence': scaled_prices[-sequence_length:].reshape(-1, 1),
+        'model_type': model_type,
+        'weights': weights
+    }
+    
+    # Hold out the most recent windows to score one-step accuracy
+    n_val = len(X) // 10
+    if n_val > 0:
+        W, b = _fit_readout(H[:-n_val], y[:-n_val], ridge)
+        predicted = unscale(model_info, H[-n_val:] @ W + b)
+        actual = unscale(model_info, y[-n_val:])
+        model_info['accuracy'] = round(float(100 - evaluate_model(actual, predicted)['mape']), 2)
+    else:
+        model_info['accuracy'] = None
+    
+    W, model_info['b_out'] = _fit_readout(H, y, ridge)
+    model_info['W_out'] = W[:hidden_size]
+    if Z is not None:
+        model_info['W_exog'] = W[hidden_size:]
+        model_info['exog_mean'] = exog_mean
+        model_info['exog_std'] = exog_std
+        model_info['exog_last'] = Z[-1]
+    
+    return model_info
+
+def _location_slug(location):
+    """
+    Collision-safe slug for a market: the one the columnar store assigned,
+    else the one it would assign among the locations in the price data
+    """
+    slug = location_slug(location)
+    if slug is None:
+        data = load_historical_data()
+        known = data['location'].astype(str).unique() if 'location' in data.columns else []
+        slug = assign_slugs(sorted(set(known) | {str(location)}))[str(location)]
+    return slug
+
+def artifact_name(model_type, location=None):
     """
+    Artifact name for a model type, optionally specific to one market
+    """
+    if location is None:
+        return f'{model_type}_model'
+    return f'{model_type}_{_location_slug(location)}_model'
+
+def train_model(data, model_type='lstm', sequence_length=60, hidden_size=32,
+                ridge=1e-3, seed=42, location=None, use_features=None):
+    """
+    Train a recurrent (LSTM/GRU/RNN) model for ginger price prediction
+    and save it as an artifact under Config.MODEL_PATH
+    
+    With use_features (default Config.TRAIN_WITH_WEATHER_FEATURES) the rows
+    of data are aligned with weather by the feature store first, and the
+    weather features become extra readout inputs. Either way multi-market
+    data is narrowed to one series (see price_series).
+    """
+    if use_features is None:
+        use_features = Config.TRAIN_WITH_WEATHER_FEATURES
     try:
-        # Prepare the data
-        prices = data['price'].values.reshape(-1, 1)
-        
-        # Scale the data
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_prices = scaler.fit_transform(prices)
-        
-        # Create sequences
-        X, y = create_sequences(scaled_prices.flatten(), sequence_length)
-        
-        # Reshape X for LSTM input (samples, time steps, features)
-        X = X.reshape((X.shape[0], X.shape[1], 1))
-        
-        # For this demo, we'll return a simple model placeholder
-        # In a real application, you would train an actual LSTM model here
-        model_info = {
-            'scaler': scaler,
-            'sequence_length': sequence_length,
-            'last_sequence': X[-1] if len(X) > 0 else np.zeros((sequence_length, 1)),
-            'model_type': 'lstm'
-        }
+        if use_features:
+            features = get_training_features(data, location)
+            prices = features['prices']
+            model_info = fit_model(prices, model_type, sequence_length, hidden_size, ridge, seed,
+                                   exog=features['exog'])
+            model_info['exog_columns'] = features['exog_columns']
+        else:
+            prices = price_series(data, location)['price'].values
+            model_info = fit_model(prices, model_type, sequence_length, hidden_size, ridge, seed)
+        model_info['location'] = location
         
-        # Save the model info
-        model_path = os.path.join(Config.MODEL_PATH, 'lstm_model.pkl')
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
-        joblib.dump(model_info, model_path)
+        # Save as a versioned .npz + JSON manifest artifact
+        manifest = save_artifact(model_info, Config.MODEL_PATH, artifact_name(model_type, location),
+                                 fingerprint=data_fingerprint(prices))
+        # Same version as the loaded artifact, so its forecasts share cache keys
+        model_info['version'] = manifest['version']
         
         return model_info
     
     except Exception as e:
-        print(f"Error training LSTM model: {str(e)}")
+        print(f"Error training {model_type.upper()} model: {str(e)}")
         return None
 
-def predict_ginger_price(days_ahead=7, model_type='lstm'):
+def train_lstm_model(data, sequence_length=60):
+    """
+    Train an LSTM model for ginger price prediction
+    """
+    return train_model(data, 'lstm', sequence_length)
+
+def _get_model(model_type, location=None):
+    """
+    Get the saved model for a market (location None: the all-market daily
+    mean), training one on that market's history if none exists yet
+    """
+    model = load_model(model_type, location)
+    if model is None or 'weights' not in model or model.get('location') != location:
+        history = price_series(load_historical_data(), location)
+        if history.empty:
+            raise ValueError(f"No price data for location: {location}")
+        model = train_model(history, model_type, location=location)
+    if model is None:
+        raise ValueError(f"No {model_type.upper()} model available")
+    return model
+
+def _forecast_key(model_type, model, window):
+    return (model_type, model.get('version') or id(model), data_fingerprint(window))
+
+def _today():
+    from datetime import datetime
+    return np.datetime64(datetime.now().date(), 'D')
+
+def _forecast_dates(start, count, today=None):
+    """
+    'YYYY-MM-DD' labels for forecast days start+1 .. start+count from today
+    """
+    today = _today() if today is None else today
+    return np.datetime_as_string(today + np.arange(start + 1, start + count + 1)).tolist()
+
+def _format_points(model_type, dates, forecast_prices):
+    model_used = model_type.upper()
+    return [
+        {
+            'date': date,
+            'predicted_price': round(predicted_price, 2),
+            'model_used': model_used
+        }
+        for date, predicted_price in zip(dates, np.asarray(forecast_prices, dtype=np.float64).tolist())
+    ]
+
+def _format_prediction(model, model_type, window, forecast_prices):
+    """
+    Build the prediction payload returned to routes
+    """
+    return {
+        'current_price': float(window[-1]),
+        'predictions': _format_points(model_type, _forecast_dates(0, len(forecast_prices)), forecast_prices),
+        'model_used': model_type.upper(),
+        'accuracy': model.get('accuracy')
+    }
+
+def predict_ginger_price(days_ahead=7, model_type='lstm', location=None):
     """
     Predict ginger price for the specified number of days
+    
+    Raises ValueError when there is no model or no price data for the
+    location, so callers report the failure instead of a made-up forecast.
     """
     try:
-        # Load historical data
-        data = load_historical_data()
-        
-        # For this demo, we'll return a simple prediction based on recent trends
-        # In a real application, you would load and use the trained model
-        recent_prices = data['price'].tail(30).values  # Last 30 days of prices
-        current_price = recent_prices[-1]
+        model = _get_model(model_type, location)
         
-        # Calculate average daily change for trend estimation
-        daily_changes = np.diff(recent_prices)
-        avg_daily_change = np.mean(daily_changes)
-        
-        predictions = []
-        for i in range(1, days_ahead + 1):
-            predicted_price = current_price + (avg_daily_change * i)
-            # Add some random variation to make it more realistic
-            variation = np.random.normal(0, 500)  # Random variation of ±500
-            predicted_price += variation
-            predicted_price = max(predicted_price, 10000)  # Ensure minimum price
-            
-            from datetime import datetime, timedelta
-            future_date = datetime.now() + timedelta(days=i)
-            
-            predictions.append({
-                'date': future_date.strftime('%Y-%m-%d'),
-                'predicted_price': round(predicted_price, 2),
-                'model_used': model_type.upper()
-            })
+        # Load only the window the model consumes instead of the full history
+        data = load_recent_prices(model['sequence_length'], location)
+        recent_prices = data['price'].values
+        if len(recent_prices) == 0:
+            raise ValueError(f"No price data for location: {location}")
         
-        result = {
-            'current_price': current_price,
-            'predictions': predictions,
-            'model_used': model_type.upper(),
-            'accuracy': 95.0  # Placeholder accuracy
-        }
+        # Reuse a cached forecast for the same model version and input window
+        forecast_prices = forecast_cache.get_or_compute(
+            _forecast_key(model_type, model, recent_prices), days_ahead,
+            lambda horizon: forecast(model, recent_prices, horizon)[0]
+        )
         
-        return result
+        return _format_prediction(model, model_type, recent_prices, forecast_prices)
     
     except Exception as e:
         print(f"Error making prediction: {str(e)}")
-        # Return a default prediction in case of error
-        from datetime import datetime, timedelta
-        
-        predictions = []
-        current_price = 34500  # Default current price
-        daily_change = 500     # Default daily change
-        
-        for i in range(1, days_ahead + 1):
-            predicted_price = current_price + (daily_change * i)
-            future_date = datetime.now() + timedelta(days=i)
+        record_error('prediction')
+        raise
+
+def stream_ginger_price(days_ahead=7, model_type='lstm', location=None, chunk_size=256):
+    """
+    Produce a forecast incrementally for streaming responses
+    
+    Yields ('meta', {...}) first, then ('points', [...]) chunks of at most
+    chunk_size days as the recurrence produces them, so memory stays flat
+    for any horizon. A missing model or window raises when the first item
+    is taken.
+    """
+    model = _get_model(model_type, location)
+    window = load_recent_prices(model['sequence_length'], location)['price'].values
+    if len(window) == 0:
+        raise ValueError(f"No price data for location: {location}")
+    
+    # Short horizons may already be cached; long ones are never cached
+    cached = forecast_cache.get(_forecast_key(model_type, model, window), days_ahead)
+    
+    yield 'meta', {
+        'current_price': float(window[-1]),
+        'model_used': model_type.upper(),
+        'accuracy': model.get('accuracy'),
+        'days_ahead': days_ahead
+    }
+    
+    if cached is not None:
+        chunks = (cached[start:start + chunk_size] for start in range(0, days_ahead, chunk_size))
+    else:
+        chunks = (prices[0] for prices in iter_forecast(model, window, days_ahead, chunk_size))
+    
+    today, offset = _today(), 0
+    while True:
+        # Time producing each chunk, not the client consuming it
+        with timed('inference'):
+            forecast_prices = next(chunks, None)
+        if forecast_prices is None:
+            break
+        dates = _forecast_dates(offset, len(forecast_prices), today)
+        yield 'points', _format_points(model_type, dates, forecast_prices)
+        offset += len(forecast_prices)
+
+def predict_ginger_price_batch(items):
+    """
+    Predict many (location, model_type, days_ahead) items at once
+    
+    Items are grouped by model and input window length so each group runs
+    through a single vectorized forecast at its longest horizon; shorter
+    items are slices of it. Returns one entry per item, in order, holding
+    either {'prediction': ...} or {'error': ...}.
+    """
+    results = [None] * len(items)
+    models = {}
+    groups = {}
+    
+    for index, item in enumerate(items):
+        try:
+            model_type = item.get('model_type', 'lstm')
+            days_ahead = int(item.get('days_ahead', 1))
+            location = item.get('location')
+            if model_type not in MODEL_TYPES:
+                raise ValueError(f"Unknown model type: {model_type}")
+            if not 1 <= days_ahead <= Config.MAX_STREAM_DAYS:
+                raise ValueError(f"days_ahead must be between 1 and {Config.MAX_STREAM_DAYS}")
+            
+            model_key = (model_type, location)
+            if model_key not in models:
+                models[model_key] = _get_model(model_type, location)
+            model = models[model_key]
+            
+            window = load_recent_prices(model['sequence_length'], location)['price'].values
+            if len(window) == 0:
+                raise ValueError(f"No price data for location: {location}")
             
-            predictions.append({
-                'date': future_date.strftime('%Y-%m-%d'),
-                'predicted_price': predicted_price,
-                'model_used': model_type.upper()
-            })
+            key = _forecast_key(model_type, model, window)
+            cached = forecast_cache.get(key, days_ahead)
+            if cached is not None:
+                results[index] = {'prediction': _format_prediction(model, model_type, window, cached)}
+                continue
+            
+            group = groups.setdefault((model_type, id(model), len(window)), {'model': model, 'items': {}})['items']
+            member = group.setdefault(key, {'window': window, 'members': []})
+            member['members'].append((index, days_ahead))
+        except Exception as e:
+            results[index] = {'error': str(e)}
+    
+    for (model_type, _, _), group_info in groups.items():
+        model, group = group_info['model'], group_info['items']
+        horizon = forecast_cache.compute_horizon(
+            max(days for entry in group.values() for _, days in entry['members'])
+        )
+        try:
+            windows = np.stack([entry['window'] for entry in group.values()])
+            forecasts = forecast(model, windows, horizon)
+        except Exception as e:
+            for entry in group.values():
+                for index, _ in entry['members']:
+                    results[index] = {'error': str(e)}
+            continue
         
-        return {
-            'current_price': current_price,
-            'predictions': predictions,
-            'model_used': model_type.upper(),
-            'accuracy': 85.0
-        }
+        for (key, entry), forecast_prices in zip(group.items(), forecasts):
+            forecast_cache.put(key, forecast_prices)
+            for index, days_ahead in entry['members']:
+                results[index] = {'prediction': _format_prediction(
+                    model, model_type, entry['window'], forecast_prices[:days_ahead]
+                )}
+    
+    return results
+
+@timed_stage('model_load')
+def _load_artifact(model_path):
+    """
+    Deserialize a model artifact from disk
+    """
+    if model_path.endswith('.json'):
+        return load_artifact(model_path, mmap=True)
+    # Legacy pickled model from before the .npz artifact format
+    return joblib.load(model_path)
+
+# Loaded models stay warm per worker and are swapped when the file changes
+model_registry = ModelRegistry(_load_artifact, Config.MODEL_CACHE_BYTES)
+
+# Forecasts keyed by model version and input window; cleared when prices are re-ingested
+forecast_cache = ForecastCache(Config.FORECAST_CACHE_TTL, Config.FORECAST_CACHE_SIZE)
+register_ingest_listener(lambda dataset: forecast_cache.invalidate() if dataset == 'prices' else None)
 
-def load_model(model_type='lstm'):
+register_collector(lambda: cache_samples('model_registry', model_registry.stats,
+                                         ('hits', 'misses', 'swaps', 'evictions'))
+                   + cache_samples('forecast', forecast_cache.stats,
+                                   ('hits', 'misses', 'extensions', 'expirations', 'evictions', 'invalidations')))
+
+def load_model(model_type='lstm', location=None):
     """
-    Load a trained model
+    Load a trained model, preferring one trained for the given market
     """
     try:
-        model_path = os.path.join(Config.MODEL_PATH, f'{model_type}_model.pkl')
-        if os.path.exists(model_path):
-            return joblib.load(model_path)
-        else:
-            return None
+        if location is not None:
+            model_path = os.path.join(Config.MODEL_PATH, f'{artifact_name(model_type, location)}.json')
+            if os.path.exists(model_path):
+                return model_registry.get(model_path)
+        
+        model_path = os.path.join(Config.MODEL_PATH, f'{model_type}_model.json')
+        if not os.path.exists(model_path):
+            model_path = os.path.join(Config.MODEL_PATH, f'{model_type}_model.pkl')
+        return model_registry.get(model_path)
     except Exception as e:
         print(f"Error loading model: {str(e)}")
         return None
@@ -0,0 +1,203 @@
+import argparse
+import itertools
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from config import Config
+from models.artifacts import save_artifact, promote_artifact, data_fingerprint
+from models.inference import MODEL_TYPES
+from models.train_model import fit_model, artifact_name
+from utils.columnar_store import load_manifest, load_prices
+from utils.data_loader import load_historical_data, price_series
+
+# Per-worker view of the shared price buffer, set up once by _init_worker
+_worker_state = {}
+
+def prepare_series(locations=None):
+    """
+    Collect the price series to train on as {location: ndarray}
+
+    Uses every market in the columnar store when it has been ingested, or a
+    single (location=None) series from the historical CSV otherwise (the
+    daily mean when the CSV covers several markets).
+    """
+    manifest = load_manifest('prices')
+    if manifest is None:
+        return {None: price_series(load_historical_data())['price'].values.astype(np.float64)}
+
+    if locations is None:
+        locations = sorted({p['location'] for p in manifest['partitions']})
+    return {location: load_prices(location=location)['price'].values.astype(np.float64)
+            for location in locations}
+
+def build_jobs(model_types, locations, grid):
+    """
+    Expand (model_type x location x hyperparameter) combinations into jobs
+
+    grid maps a fit_model keyword (e.g. hidden_size) to candidate values.
+    """
+    keys = sorted(grid)
+    jobs = []
+    for model_type, location in itertools.product(model_types, locations):
+        for values in itertools.product(*(grid[k] for k in keys)):
+            jobs.append({'model_type': model_type, 'location': location,
+                         'params': dict(zip(keys, values))})
+    return jobs
+
+def _job_name(job, tag_params):
+    name = artifact_name(job['model_type'], job['location'])
+    if tag_params:
+        suffix = '_'.join(f"{k}{v}" for k, v in sorted(job['params'].items()))
+        name = f"{name[:-len('_model')]}_{suffix}_model"
+    return name
+
+def _init_worker(shm_name, offsets, model_path):
+    """
+    Attach to the shared price buffer once per worker process
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    total = max((start + length for start, length in offsets.values()), default=0)
+    _worker_state['shm'] = shm
+    _worker_state['buffer'] = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+    _worker_state['offsets'] = offsets
+    _worker_state['model_path'] = model_path
+
+def _series_for(location):
+    start, length = _worker_state['offsets'][location]
+    return _worker_state['buffer'][start:start + length]
+
+def _run_job(job, name):
+    """
+    Fit and save one model; returns a summary with its wall time
+    """
+    started = time.perf_counter()
+    prices = _series_for(job['location'])
+    model_info = fit_model(prices, job['model_type'], **job['params'])
+    model_info['location'] = job['location']
+    manifest = save_artifact(model_info, _worker_state['model_path'], name,
+                             fingerprint=data_fingerprint(prices))
+    return {
+        'name': name,
+        'model_type': job['model_type'],
+        'location': job['location'],
+        'params': job['params'],
+        'accuracy': model_info['accuracy'],
+        'version': manifest['version'],
+        'wall_time': time.perf_counter() - started,
+        'pid': os.getpid()
+    }
+
+def run_training(model_types=MODEL_TYPES, locations=None, grid=None, processes=None,
+                 serial=False, promote=True):
+    """
+    Train every (model_type x location x hyperparameter) job
+
+    The prepared series are copied once into a shared-memory buffer that
+    workers attach to in their initializer, so tasks only carry the job
+    description instead of re-pickling the data. With serial=True the same
+    jobs run in-process, which is the baseline the speedup is measured
+    against; estimated_speedup only divides summed job time by wall time.
+    When promote is set the most accurate variant of each (model_type,
+    location) is also published under its canonical artifact name.
+    """
+    grid = grid or {}
+    series = prepare_series(locations)
+    jobs = build_jobs(model_types, list(series), grid)
+    tag_params = any(len(values) > 1 for values in grid.values())
+
+    offsets, cursor = {}, 0
+    for location, values in series.items():
+        offsets[location] = (cursor, len(values))
+        cursor += len(values)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(cursor, 1) * 8)
+    try:
+        buffer = np.ndarray((cursor,), dtype=np.float64, buffer=shm.buf)
+        for location, values in series.items():
+            start, length = offsets[location]
+            buffer[start:start + length] = values
+
+        results, errors = [], []
+        started = time.perf_counter()
+        if serial:
+            _init_worker(shm.name, offsets, Config.MODEL_PATH)
+            for job in jobs:
+                try:
+                    results.append(_run_job(job, _job_name(job, tag_params)))
+                except Exception as e:
+                    errors.append({'job': job, 'error': str(e)})
+            _worker_state.pop('shm').close()
+        else:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                     initargs=(shm.name, offsets, Config.MODEL_PATH)) as pool:
+                futures = {pool.submit(_run_job, job, _job_name(job, tag_params)): job for job in jobs}
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        errors.append({'job': futures[future], 'error': str(e)})
+        total_wall = time.perf_counter() - started
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if promote and tag_params:
+        _promote_best(results)
+
+    # Summed job time approximates a serial run; only --compare-serial measures one
+    job_time = sum(r['wall_time'] for r in results)
+    return {
+        'jobs': sorted(results, key=lambda r: r['name']),
+        'errors': errors,
+        'total_wall_time': total_wall,
+        'serial_job_time': job_time,
+        'estimated_speedup': job_time / total_wall if total_wall > 0 else None
+    }
+
+def _promote_best(results):
+    """
+    Publish the most accurate variant per (model_type, location) under the
+    canonical artifact name that load_model looks for, reusing the artifact
+    its worker already saved instead of fitting it again
+    """
+    best = {}
+    for result in results:
+        key = (result['model_type'], result['location'])
+        score = result['accuracy'] if result['accuracy'] is not None else float('-inf')
+        if key not in best or score > best[key][0]:
+            best[key] = (score, result)
+
+    for (model_type, location), (_, result) in best.items():
+        promote_artifact(Config.MODEL_PATH, result['name'], artifact_name(model_type, location))
+        result['promoted'] = True
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='Train price models in parallel')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_TYPES), choices=MODEL_TYPES)
+    parser.add_argument('--locations', nargs='+', default=None)
+    parser.add_argument('--sequence-length', nargs='+', type=int, default=[60])
+    parser.add_argument('--hidden-size', nargs='+', type=int, default=[32])
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--compare-serial', action='store_true',
+                        help='also run the jobs serially and report the measured speedup')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = _parse_args()
+    grid = {'sequence_length': args.sequence_length, 'hidden_size': args.hidden_size}
+
+    report = run_training(args.models, args.locations, grid, args.processes)
+    for job in report['jobs']:
+        print(f"{job['name']}: accuracy={job['accuracy']} wall={job['wall_time']:.3f}s")
+    for error in report['errors']:
+        print(f"FAILED {error['job']}: {error['error']}")
+    print(f"Parallel: {report['total_wall_time']:.3f}s wall, "
+          f"{report['serial_job_time']:.3f}s of job time "
+          f"(~{report['estimated_speedup']:.2f}x estimated; --compare-serial measures it)")
+
+    if args.compare_serial:
+        serial = run_training(args.models, args.locations, grid, serial=True)
+        print(f"Serial: {serial['total_wall_time']:.3f}s wall, "
+              f"measured speedup {serial['total_wall_time'] / report['total_wall_time']:.2f}x")
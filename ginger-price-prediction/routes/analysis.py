@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template
-from utils.data_loader import load_historical_data
+from utils.data_loader import load_backtest_results
+from utils.analytics import get_price_analytics
+from utils.feature_store import get_feature_set
 import pandas as pd
 
 bp = Blueprint('analysis', __name__)
@@ -7,51 +9,63 @@ bp = Blueprint('analysis', __name__)
 @bp.route('/analysis')
 def correlation():
     """Price correlation and analysis"""
-    # Load historical data
-    data = load_historical_data()
+    # Running aggregates, kept up to date as rows are added
+    analysis_data = get_price_analytics().stats()
     
-    # Perform basic analysis
-    analysis_data = {
-        'total_records': len(data),
-        'date_range': {
-            'start': data['date'].min().strftime('%Y-%m-%d'),
-            'end': data['date'].max().strftime('%Y-%m-%d')
-        },
-        'price_stats': {
-            'min': data['price'].min(),
-            'max': data['price'].max(),
-            'avg': data['price'].mean(),
-            'std': data['price'].std()
-        }
-    }
+    # Correlation of each weather/lag feature with price, from the feature store
+    try:
+        features = get_feature_set()
+        analysis_data['feature_correlations'] = features['correlations']
+        analysis_data['feature_rows'] = len(features['matrix'])
+    except Exception as e:
+        print(f"Error loading feature correlations: {str(e)}")
+        analysis_data['feature_correlations'] = {}
+        analysis_data['feature_rows'] = 0
     
     return render_template('analysis/correlation.html', analysis=analysis_data)
 
 @bp.route('/analysis/trends')
 def trends():
     """Price trends analysis"""
-    # Load historical data
-    data = load_historical_data()
-    
-    # Calculate trends
-    data['price_change'] = data['price'].pct_change() * 100
-    data['moving_avg'] = data['price'].rolling(window=7).mean()
-    
-    # Get recent trends
-    recent_trends = data.tail(30).to_dict('records')
+    # % change and 7-day moving average over the retained tail only
+    recent_trends = get_price_analytics().recent_trends(30)
     
     return render_template('analysis/trends.html', trends=recent_trends)
 
 @bp.route('/analysis/comparison')
 def comparison():
     """Model comparison"""
-    # This would normally compare different model performances
-    comparison_data = {
-        'models': [
-            {'name': 'LSTM', 'accuracy': 95.2, 'mape': 4.8},
-            {'name': 'RNN', 'accuracy': 92.1, 'mape': 7.9},
-            {'name': 'GRU', 'accuracy': 94.5, 'mape': 5.5}
-        ]
-    }
+    # Metrics come from the precomputed walk-forward backtest table
+    results = load_backtest_results()
+    
+    if results.empty:
+        # No backtest has been run yet (python -m models.backtest)
+        comparison_data = {
+            'models': [],
+            'computed_at': None
+        }
+    else:
+        summary = results.groupby('model_type').agg(
+            mae=('mae', 'mean'),
+            rmse=('rmse', 'mean'),
+            mape=('mape', 'mean'),
+            origins=('origins', 'max'),
+            horizon=('horizon', 'max')
+        )
+        comparison_data = {
+            'models': [
+                {
+                    'name': model_type.upper(),
+                    'accuracy': round(float(100 - row['mape']), 1),
+                    'mape': round(float(row['mape']), 1),
+                    'mae': round(float(row['mae']), 2),
+                    'rmse': round(float(row['rmse']), 2),
+                    'origins': int(row['origins']),
+                    'horizon': int(row['horizon'])
+                }
+                for model_type, row in summary.iterrows()
+            ],
+            'computed_at': results['computed_at'].max()
+        }
     
-    return render_template('analysis/comparison.html', comparison=comparison_data)
\ No newline at end of file
+    return render_template('analysis/comparison.html', comparison=comparison_data)
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request, url_for, current_app
+from config import Config
 from utils.data_loader import load_historical_data
 from utils.weather_api import get_current_weather
+from utils.charts import CHART_SERIES, chart_etag, get_chart_data
 import pandas as pd
 
 bp = Blueprint('dashboard', __name__)
@@ -16,28 +18,68 @@ def index():
         avg_temperature = 28
         rainfall = 45
         
-        # Load historical data for charts
-        historical_data = load_sample_data()
+        # Charts fetch their (downsampled) history from the chart-data API
+        price_chart_url = url_for('dashboard.chart_data', series='price', days=365)
         
         return render_template('dashboard/index.html', 
                              current_price=current_price,
                              predicted_price=predicted_price,
                              avg_temperature=avg_temperature,
                              rainfall=rainfall,
-                             historical_data=historical_data)
+                             price_chart_url=price_chart_url)
     except Exception as e:
         # In case of error, render with default values
         return render_template('dashboard/index.html')
 
-def load_sample_data():
-    """Load sample data for dashboard charts"""
-    # This is sample data - in a real app, this would come from your data source
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    prices = [18000, 19500, 21000, 22500, 24000, 25500, 
-              27000, 28500, 30000, 31500, 33000, 34500]
+@bp.route('/api/chart-data')
+def chart_data():
+    """API endpoint for a downsampled chart series"""
+    series = request.args.get('series', 'price')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    days = request.args.get('days', type=int)
+    location = request.args.get('location')
+    points = request.args.get('points', Config.CHART_DEFAULT_POINTS, type=int)
     
-    return {
-        'months': months,
-        'prices': prices
-    }
\ No newline at end of file
+    if series not in CHART_SERIES:
+        return jsonify({
+            'success': False,
+            'error': f"Unknown series '{series}'; expected one of {', '.join(CHART_SERIES)}"
+        }), 400
+    try:
+        for value in (start, end):
+            if value is not None:
+                pd.Timestamp(value)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'start and end must be dates (YYYY-MM-DD)'
+        }), 400
+    if days is not None and days <= 0:
+        return jsonify({
+            'success': False,
+            'error': 'days must be positive'
+        }), 400
+    points = max(3, min(points, Config.CHART_MAX_POINTS))
+    
+    # Answer revalidations from the source version alone, before loading data
+    etag = chart_etag(series, start, end, days, location, points)
+    if etag is not None and etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    payload = get_chart_data(etag, series=series, start=start, end=end, days=days,
+                             location=location, points=points)
+    response = jsonify({
+        'success': True,
+        'chart': payload
+    })
+    response.headers['Cache-Control'] = 'no-cache'
+    if etag is not None:
+        response.set_etag(etag)
+        return response
+    # Sample data has no source version; fall back to hashing the body
+    response.add_etag()
+    return response.make_conditional(request)
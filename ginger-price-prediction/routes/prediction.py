@@ -1,5 +1,10 @@
-from flask import Blueprint, render_template, request, jsonify
-from models.train_model import predict_ginger_price
+import json
+from flask import Blueprint, Response, render_template, request, jsonify, session, stream_with_context
+from config import Config
+from models.train_model import (predict_ginger_price, predict_ginger_price_batch, stream_ginger_price,
+                                model_registry, forecast_cache)
+from models.inference import MODEL_TYPES
+from database.predictions import record_predictions, get_prediction_page
 import pandas as pd
 
 bp = Blueprint('prediction', __name__)
@@ -12,9 +17,11 @@ def predict_price():
             # Get form data
             days_ahead = int(request.form.get('days_ahead', 1))
             model_type = request.form.get('model_type', 'lstm')
+            location = request.form.get('location') or None
             
             # Make prediction using the model
-            prediction = predict_with_model(days_ahead, model_type)
+            prediction = predict_with_model(days_ahead, model_type, location)
+            record_predictions([(prediction, model_type, location)], session.get('user_id'))
             
             return render_template('prediction/results.html', 
                                  prediction=prediction, 
@@ -30,9 +37,34 @@ def predict_price():
 @bp.route('/prediction/history')
 def history():
     """Show prediction history"""
-    # This would load prediction history from database
-    prediction_history = get_prediction_history()
-    return render_template('prediction/history.html', history=prediction_history)
+    try:
+        prediction_history, next_cursor = get_prediction_history(
+            request.args.get('cursor'), request.args.get('limit', 20, type=int)
+        )
+    except (ValueError, UnicodeDecodeError):
+        return render_template('prediction/history.html', history=[], next_cursor=None,
+                               error='Invalid cursor'), 400
+    return render_template('prediction/history.html', history=prediction_history,
+                           next_cursor=next_cursor)
+
+@bp.route('/api/predictions/history')
+def api_history():
+    """API endpoint for paginated prediction history"""
+    try:
+        prediction_history, next_cursor = get_prediction_history(
+            request.args.get('cursor'), request.args.get('limit', 20, type=int)
+        )
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid cursor'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'history': prediction_history,
+        'next_cursor': next_cursor
+    })
 
 @bp.route('/api/predict', methods=['POST'])
 def api_predict():
@@ -41,8 +73,14 @@ def api_predict():
         data = request.get_json()
         days_ahead = data.get('days_ahead', 1)
         model_type = data.get('model_type', 'lstm')
+        location = data.get('location')
+        
+        stream_format = get_stream_format(data)
+        if stream_format:
+            return stream_prediction_response(days_ahead, model_type, location, stream_format)
         
-        prediction = predict_with_model(days_ahead, model_type)
+        prediction = predict_with_model(days_ahead, model_type, location)
+        record_predictions([(prediction, model_type, location)], session.get('user_id'))
         
         return jsonify({
             'success': True,
@@ -56,60 +94,129 @@ def api_predict():
             'error': str(e)
         }), 400
 
-def predict_with_model(days_ahead=1, model_type='lstm'):
+@bp.route('/api/predict/batch', methods=['POST'])
+def api_predict_batch():
+    """API endpoint for many predictions in one call"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            'success': False,
+            'error': "Expected a non-empty list of {location, model_type, days_ahead} items"
+        }), 400
+    if len(items) > Config.MAX_BATCH_ITEMS:
+        return jsonify({
+            'success': False,
+            'error': f"Batch exceeds {Config.MAX_BATCH_ITEMS} items"
+        }), 400
+    
+    items = [item if isinstance(item, dict) else {} for item in items]
+    outcomes = predict_ginger_price_batch(items)
+    record_predictions([
+        (outcome['prediction'], item.get('model_type', 'lstm'), item.get('location'))
+        for item, outcome in zip(items, outcomes) if 'prediction' in outcome
+    ], session.get('user_id'))
+    
+    results = []
+    for item, outcome in zip(items, outcomes):
+        entry = {
+            'location': item.get('location'),
+            'model_type': item.get('model_type', 'lstm'),
+            'days_ahead': item.get('days_ahead', 1),
+            'success': 'error' not in outcome
+        }
+        entry.update(outcome)
+        results.append(entry)
+    
+    return jsonify({
+        'success': True,
+        'results': results
+    })
+
+@bp.route('/api/models')
+def api_models():
+    """API endpoint listing the model versions resident in this worker"""
+    return jsonify({
+        'success': True,
+        'models': model_registry.resident(),
+        'stats': dict(model_registry.stats),
+        'forecast_cache': forecast_cache.get_stats()
+    })
+
+def predict_with_model(days_ahead=1, model_type='lstm', location=None):
     """Make prediction using the selected model"""
-    # This is a placeholder - in a real app, this would call your trained model
-    # For now, return sample data
-    from datetime import datetime, timedelta
+    days_ahead = int(days_ahead)
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    if not 1 <= days_ahead <= Config.MAX_STREAM_DAYS:
+        raise ValueError(f"days_ahead must be between 1 and {Config.MAX_STREAM_DAYS}")
     
-    current_price = 34500  # Sample current price
-    daily_change = 700     # Sample daily increase
+    return predict_ginger_price(days_ahead, model_type, location)
+
+def stream_with_model(days_ahead=1, model_type='lstm', location=None):
+    """Start a streamed prediction; returns (meta, iterator of point chunks)"""
+    days_ahead = int(days_ahead)
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    if not 1 <= days_ahead <= Config.MAX_STREAM_DAYS:
+        raise ValueError(f"days_ahead must be between 1 and {Config.MAX_STREAM_DAYS}")
     
-    predictions = []
-    for i in range(1, days_ahead + 1):
-        future_date = datetime.now() + timedelta(days=i)
-        predicted_price = current_price + (daily_change * i)
-        
-        predictions.append({
-            'date': future_date.strftime('%Y-%m-%d'),
-            'predicted_price': predicted_price,
-            'model_used': model_type.upper()
-        })
+    events = stream_ginger_price(days_ahead, model_type, location)
+    _, meta = next(events)
+    return meta, (points for _, points in events)
+
+def get_stream_format(data):
+    """'ndjson' or 'sse' when the client asked for a streamed response"""
+    requested = str(data.get('stream') or request.args.get('stream') or '').lower()
+    if requested in ('ndjson', 'sse'):
+        return requested
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+def _encode_event(stream_format, event, payload):
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps(dict(payload, type=event)) + '\n'
+
+def stream_prediction_response(days_ahead, model_type, location, stream_format):
+    """
+    Stream a forecast as NDJSON lines or server-sent events
     
-    return {
-        'current_price': current_price,
-        'predictions': predictions,
-        'model_used': model_type.upper(),
-        'accuracy': 98.5  # Sample accuracy
-    }
+    A 'meta' record comes first, then one 'point' record per day as chunks
+    are produced, then 'end' (or 'error' if the forecast fails midway).
+    Each chunk is recorded in the history (one bulk insert) as it is sent,
+    so memory stays flat whatever the horizon; the points sent before a
+    failure stay recorded. Validation errors raise before the response
+    starts so they still return a 400.
+    """
+    meta, chunks = stream_with_model(days_ahead, model_type, location)
+    user_id = session.get('user_id')
+    
+    def generate():
+        yield _encode_event(stream_format, 'meta', meta)
+        count = 0
+        try:
+            for points in chunks:
+                yield ''.join(_encode_event(stream_format, 'point', point) for point in points)
+                record_predictions([({'current_price': meta['current_price'], 'predictions': points},
+                                     model_type, location)], user_id)
+                count += len(points)
+        except Exception as e:
+            yield _encode_event(stream_format, 'error', {'error': str(e), 'count': count})
+            return
+        yield _encode_event(stream_format, 'end', {'count': count})
+    
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
 
-def get_prediction_history():
-    """Get prediction history from database"""
-    # This would query the database for prediction history
-    # For now, return sample data
-    return [
-        {
-            'date': '2025-12-01',
-            'model_used': 'LSTM',
-            'predicted_price': 34200,
-            'actual_price': 34500,
-            'accuracy': 98.7,
-            'status': 'Accurate'
-        },
-        {
-            'date': '2025-11-30',
-            'model_used': 'RNN',
-            'predicted_price': 33800,
-            'actual_price': 34100,
-            'accuracy': 98.1,
-            'status': 'Accurate'
-        },
-        {
-            'date': '2025-11-29',
-            'model_used': 'GRU',
-            'predicted_price': 34600,
-            'actual_price': 34300,
-            'accuracy': 97.8,
-            'status': 'Moderate'
-        }
-    ]
\ No newline at end of file
+def get_prediction_history(cursor=None, limit=20):
+    """Get a page of the current user's prediction history from database"""
+    limit = max(1, min(limit, 100))
+    return get_prediction_page(session.get('user_id'), cursor, limit)
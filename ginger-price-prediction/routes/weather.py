@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template
-from utils.weather_api import get_current_weather, get_weather_forecast
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, jsonify
+from utils.weather_api import get_current_weather, get_weather_forecast, get_historical_weather
 
 bp = Blueprint('weather', __name__)
 
+# Longest range one history request may backfill and return
+MAX_HISTORY_DAYS = 3660
+
 @bp.route('/weather')
 def current_weather():
     """Current weather information"""
@@ -13,4 +17,27 @@ def current_weather():
 def forecast():
     """Weather forecast"""
     forecast_data = get_weather_forecast()
-    return render_template('weather/forecast.html', forecast=forecast_data)
\ No newline at end of file
+    return render_template('weather/forecast.html', forecast=forecast_data)
+
+@bp.route('/api/weather/history')
+def api_history():
+    """API endpoint for daily weather over a date range (default: last 30 days)"""
+    end_date = request.args.get('end') or datetime.now().strftime('%Y-%m-%d')
+    city = request.args.get('city', 'Jakarta')
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        start_date = request.args.get('start') or (end - timedelta(days=29)).strftime('%Y-%m-%d')
+        days = (end - datetime.strptime(start_date, '%Y-%m-%d')).days + 1
+        if not 1 <= days <= MAX_HISTORY_DAYS:
+            raise ValueError(f"Range must cover 1 to {MAX_HISTORY_DAYS} days")
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'city': city,
+        'history': get_historical_weather(start_date, end_date, city)
+    })
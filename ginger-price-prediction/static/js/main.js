@@ -27,18 +27,36 @@ function initializeCharts() {
 }
 
 // Function to create price chart
-function createPriceChart(canvas) {
+async function createPriceChart(canvas) {
     const ctx = canvas.getContext('2d');
     
-    // Sample data - in a real app, this would come from the backend
+    // History is downsampled on the server to roughly one point per pixel,
+    // so the payload stays the same size however long the history is.
+    // The browser revalidates with the ETag and gets a 304 when unchanged.
+    const url = new URL(canvas.dataset.source || '/api/chart-data?series=price&days=365', window.location.origin);
+    url.searchParams.set('points', Math.max(Math.min(canvas.clientWidth || 200, 1000), 12));
+    
+    let chart;
+    try {
+        const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        chart = (await response.json()).chart;
+    } catch (error) {
+        console.error('Failed to load price chart data:', error);
+        return;
+    }
+    
     const data = {
-        labels: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+        labels: chart.labels,
         datasets: [{
             label: 'Ginger Price (Rp/kg)',
-            data: [18000, 19500, 21000, 22500, 24000, 25500, 27000, 28500, 30000, 31500, 33000, 34500],
+            data: chart.values,
             borderColor: '#d2691e',
             backgroundColor: 'rgba(210, 105, 30, 0.1)',
             tension: 0.4,
+            pointRadius: 0,
             fill: true
         }]
     };
@@ -52,7 +70,7 @@ function createPriceChart(canvas) {
             plugins: {
                 title: {
                     display: true,
-                    text: 'Ginger Price Trend (Last 12 Months)'
+                    text: chart.start ? `Ginger Price Trend (${chart.start} to ${chart.end})` : 'Ginger Price Trend'
                 },
                 legend: {
                     display: true,
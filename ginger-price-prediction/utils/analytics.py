@@ -0,0 +1,140 @@
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from collections import deque
+from utils.data_loader import load_historical_data, get_source_signatures
+
+# Rows shown on the trends page and the moving-average window behind them
+TREND_ROWS = 30
+MOVING_AVERAGE_WINDOW = 7
+
+class PriceAnalytics:
+    """
+    Running price statistics maintained as rows arrive
+
+    count/mean/variance use Welford's algorithm (merged batch-wise with
+    Chan's formula), min/max/date range are running extremes, and only the
+    last TREND_ROWS + MOVING_AVERAGE_WINDOW - 1 rows are kept for the trend
+    series. Reading any of it costs O(1) or O(TREND_ROWS) no matter how
+    long the history is.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.first_date = None
+        self.last_date = None
+        self._tail = deque(maxlen=TREND_ROWS + MOVING_AVERAGE_WINDOW - 1)
+        # Source file signature and hash of the rows folded in (see get_price_analytics)
+        self.signature = None
+        self.digest = None
+
+    def update(self, dates, prices):
+        """
+        Fold new rows (in date order, after everything seen so far) in
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if not len(prices):
+            return
+
+        n_new = len(prices)
+        mean_new = prices.mean()
+        m2_new = ((prices - mean_new) ** 2).sum()
+
+        total = self.count + n_new
+        delta = mean_new - self.mean
+        self.mean += delta * n_new / total
+        self._m2 += m2_new + delta ** 2 * self.count * n_new / total
+        self.count = total
+
+        self.min = prices.min() if self.min is None else min(self.min, prices.min())
+        self.max = prices.max() if self.max is None else max(self.max, prices.max())
+        dates = pd.to_datetime(pd.Series(dates))
+        if self.first_date is None:
+            self.first_date = dates.iloc[0]
+        self.last_date = dates.iloc[-1]
+
+        keep = self._tail.maxlen
+        self._tail.extend(zip(dates.iloc[-keep:], prices[-keep:]))
+
+    @property
+    def std(self):
+        # Sample standard deviation, matching pandas' Series.std()
+        return float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else float('nan')
+
+    def stats(self):
+        """
+        Summary used by the /analysis page
+        """
+        return {
+            'total_records': self.count,
+            'date_range': {
+                'start': self.first_date.strftime('%Y-%m-%d') if self.first_date is not None else None,
+                'end': self.last_date.strftime('%Y-%m-%d') if self.last_date is not None else None
+            },
+            'price_stats': {
+                'min': self.min,
+                'max': self.max,
+                'avg': self.mean if self.count else float('nan'),
+                'std': self.std
+            }
+        }
+
+    def recent_trends(self, rows=TREND_ROWS):
+        """
+        Last rows with day-over-day % change and the moving average, computed
+        from the retained tail only
+        """
+        tail = pd.DataFrame(list(self._tail), columns=['date', 'price'])
+        tail['price_change'] = tail['price'].pct_change() * 100
+        tail['moving_avg'] = tail['price'].rolling(window=MOVING_AVERAGE_WINDOW).mean()
+        return tail.tail(rows).to_dict('records')
+
+_price_analytics = None
+_analytics_lock = threading.Lock()
+
+def _row_hashes(data):
+    """
+    One uint64 per (date, price) row, so any prefix can be digested cheaply
+    """
+    return pd.util.hash_pandas_object(data[['date', 'price']], index=False).values
+
+def _digest(row_hashes):
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+def get_price_analytics():
+    """
+    Get the shared price analytics, bringing it up to date with the data
+
+    Nothing is re-read while the source file's signature is unchanged. When
+    it changes, the rows already folded in are compared by hash: if they
+    are untouched and rows were only appended, just the new rows are folded
+    in; any other change (edits, deletions, reordering) rebuilds it once.
+    """
+    global _price_analytics
+    signature = get_source_signatures()['prices']
+    data = load_historical_data()
+
+    with _analytics_lock:
+        analytics = _price_analytics
+        if analytics is not None and signature is not None and analytics.signature == signature:
+            return analytics
+
+        row_hashes = _row_hashes(data)
+        if analytics is not None and analytics.count and len(data) >= analytics.count \
+                and _digest(row_hashes[:analytics.count]) == analytics.digest:
+            if len(data) > analytics.count:
+                new_rows = data.iloc[analytics.count:]
+                analytics.update(new_rows['date'], new_rows['price'].values)
+        else:
+            analytics = PriceAnalytics()
+            analytics.update(data['date'], data['price'].values)
+            _price_analytics = analytics
+
+        analytics.signature = signature
+        analytics.digest = _digest(row_hashes)
+        return analytics
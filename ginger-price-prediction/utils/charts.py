@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_historical_data, load_weather_data, get_source_signatures
+from utils.columnar_store import load_range, dataset_signature
+
+# Chartable series and the dataset each one comes from
+CHART_SERIES = {
+    'price': 'prices',
+    'temperature': 'weather',
+    'rainfall': 'weather',
+    'humidity': 'weather'
+}
+
+# Recently downsampled payloads keyed by ETag
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+_CHART_CACHE_SIZE = 64
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Returns the indices of `threshold` points that keep the visual shape of
+    the series: the first and last points, plus one point per bucket chosen
+    to span the largest triangle with the previously kept point and the
+    mean of the next bucket. Peaks and troughs survive, unlike striding.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    # Bucket i covers [edges[i], edges[i + 1]) over the interior points
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    # Mean of every bucket in one pass, plus the last point as the final "next bucket"
+    csum_x = np.concatenate([[0.0], np.cumsum(x)])
+    csum_y = np.concatenate([[0.0], np.cumsum(y)])
+    sizes = edges[1:] - edges[:-1]
+    mean_x = np.append((csum_x[edges[1:]] - csum_x[edges[:-1]]) / sizes, x[-1])
+    mean_y = np.append((csum_y[edges[1:]] - csum_y[edges[:-1]]) / sizes, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def _source_version(dataset):
+    """
+    Cheap version of the data behind a chart, without reading it
+    """
+    signature = dataset_signature(dataset)
+    if signature is not None:
+        return ['columnar'] + list(signature)
+    signature = get_source_signatures()[dataset]
+    return ['csv'] + list(signature) if signature is not None else None
+
+def chart_etag(series, start, end, days, location, points):
+    """
+    ETag for a chart request, or None when the source has no file to
+    version (sample data); computed before any data is loaded
+    """
+    version = _source_version(CHART_SERIES[series])
+    if version is None:
+        return None
+    key = [version, series, start, end, days, location, points]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+
+def _load_series(series, start, end, location):
+    """
+    Load (date, value) rows for a series, from the columnar store when
+    ingested and the CSV otherwise
+    """
+    dataset = CHART_SERIES[series]
+    df = load_range(dataset, start, end, location, columns=[series])
+    if df is None:
+        df = load_historical_data() if dataset == 'prices' else load_weather_data()
+        if location is not None and 'location' in df.columns:
+            df = df[df['location'] == location]
+        if start is not None:
+            df = df[df['date'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['date'] <= pd.Timestamp(end)]
+
+    df = df.dropna(subset=[series])
+    if location is None and 'location' in df.columns and df['location'].nunique() > 1:
+        # Several markets: chart the daily mean across them
+        df = df.groupby('date', as_index=False)[series].mean()
+    return df.sort_values('date', kind='stable')[['date', series]]
+
+def build_chart_data(series='price', start=None, end=None, days=None, location=None, points=200):
+    """
+    Downsampled chart payload: at most `points` (label, value) pairs however
+    long the underlying history is
+
+    days keeps only the last `days` days of data in [start, end].
+    """
+    df = _load_series(series, start, end, location)
+    dates = df['date'].values.astype('datetime64[D]')
+    values = df[series].values.astype(np.float64)
+    if days is not None and len(dates):
+        keep = dates > dates[-1] - np.timedelta64(days, 'D')
+        dates, values = dates[keep], values[keep]
+
+    index = lttb(dates.astype(np.int64), values, points)
+    return {
+        'series': series,
+        'location': location,
+        'start': str(dates[0]) if len(dates) else None,
+        'end': str(dates[-1]) if len(dates) else None,
+        'source_points': int(len(dates)),
+        'points': int(len(index)),
+        'labels': [str(d) for d in dates[index]],
+        'values': [round(float(v), 2) for v in values[index]]
+    }
+
+def get_chart_data(etag, **params):
+    """
+    build_chart_data, memoized by ETag so repeated requests for an unchanged
+    source skip the load and the downsampling
+    """
+    if etag is None:
+        return build_chart_data(**params)
+
+    with _chart_cache_lock:
+        if etag in _chart_cache:
+            _chart_cache.move_to_end(etag)
+            return _chart_cache[etag]
+
+    payload = build_chart_data(**params)
+    with _chart_cache_lock:
+        _chart_cache[etag] = payload
+        while len(_chart_cache) > _CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return payload
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from config import Config
+
+# Layout: <COLUMNAR_STORE_PATH>/<dataset>/v<stamp>/location=<slug>/year=<yyyy>/<column>.npy
+# with <dataset>/_manifest.json listing the live partition directories.
+# Dates are stored as datetime64[D] so a partition can be range-sliced with
+# searchsorted on a memory-mapped column without parsing anything.
+DEFAULT_LOCATION = 'default'
+
+DATASETS = {
+    'prices': {
+        'source': 'harga_jahe_2020_2024.csv',
+        'columns': {'price': 'float64'}
+    },
+    'weather': {
+        'source': 'data_cuaca_2020_2024.csv',
+        'columns': {'temperature': 'float64', 'rainfall': 'float64', 'humidity': 'float64'}
+    }
+}
+
+# Callbacks run with the dataset name after each successful ingest
+_ingest_listeners = []
+
+def register_ingest_listener(callback):
+    """
+    Register callback(dataset) to be called whenever a dataset is rewritten
+    """
+    _ingest_listeners.append(callback)
+
+def slugify_location(location):
+    """
+    Turn a market/location name into a safe partition directory name
+    """
+    slug = re.sub(r'[^a-z0-9]+', '-', str(location).strip().lower()).strip('-')
+    return slug or DEFAULT_LOCATION
+
+def assign_slugs(locations, slugs=None):
+    """
+    Map each location to a slug that is unique among them, keeping the
+    existing mapping and adding a short hash of the name when two locations
+    slugify alike (partition directories and model artifacts use these)
+    """
+    slugs = dict(slugs or {})
+    taken = set(slugs.values())
+    for location in locations:
+        if location in slugs:
+            continue
+        slug = slugify_location(location)
+        if slug in taken:
+            slug = f"{slug}-{hashlib.sha1(location.encode()).hexdigest()[:8]}"
+        slugs[location] = slug
+        taken.add(slug)
+    return slugs
+
+def _manifest_slugs(manifest):
+    # Manifests written before the mapping was recorded only have per-partition slugs
+    return manifest.get('slugs') or {p['location']: p['slug'] for p in manifest['partitions']}
+
+def _location_slug(manifest, location):
+    """
+    Slug of the partitions holding a location's rows
+    """
+    return _manifest_slugs(manifest).get(str(location)) or slugify_location(location)
+
+def location_slug(location, dataset='prices'):
+    """
+    The slug an ingested dataset assigned to a location, or None if the
+    dataset was never ingested or has no rows for it
+    """
+    manifest = load_manifest(dataset)
+    return _manifest_slugs(manifest).get(str(location)) if manifest is not None else None
+
+def _dataset_path(dataset):
+    return os.path.join(Config.COLUMNAR_STORE_PATH, dataset)
+
+def _write_partition(part, spec, part_dir, location, slug, year):
+    """
+    Save one partition's typed columns and return its manifest entry
+    """
+    os.makedirs(part_dir, exist_ok=True)
+    np.save(os.path.join(part_dir, 'date.npy'), part['date'].values.astype('datetime64[D]'))
+    for column, dtype in spec['columns'].items():
+        if column in part.columns:
+            np.save(os.path.join(part_dir, f'{column}.npy'), part[column].values.astype(dtype))
+    return {
+        'location': location,
+        'slug': slug,
+        'year': int(year),
+        'rows': len(part),
+        'start': str(part['date'].min().date()),
+        'end': str(part['date'].max().date())
+    }
+
+def _partition_dir(dataset, partition):
+    # Partitions live in versioned directories recorded in the manifest; older
+    # manifests without 'dir' used the fixed location=/year= layout
+    return os.path.join(_dataset_path(dataset), partition.get('dir') or
+                        os.path.join(f"location={partition['slug']}", f"year={partition['year']}"))
+
+def _partition_dirs(manifest):
+    """
+    Partition directories, relative to the dataset path, a manifest reads from
+    """
+    return {os.path.normpath(p.get('dir') or os.path.join(f"location={p['slug']}", f"year={p['year']}"))
+            for p in manifest['partitions']}
+
+def _remove_unreferenced(dataset, keep):
+    """
+    Delete partition directories outside keep, the ones the current and the
+    just-replaced manifest read from: a reader that loaded the old manifest
+    just before the swap can still open its partitions
+    """
+    target = _dataset_path(dataset)
+    for root, _, files in os.walk(target, topdown=False):
+        relative = os.path.relpath(root, target)
+        if relative == os.curdir:
+            continue
+        if any(name.endswith('.npy') for name in files):
+            if relative not in keep:
+                shutil.rmtree(root, ignore_errors=True)
+        elif not os.listdir(root):
+            os.rmdir(root)
+
+def _commit_manifest(dataset, manifest):
+    manifest_path = os.path.join(_dataset_path(dataset), '_manifest.json')
+    tmp_path = f"{manifest_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def write_partitions(df, dataset):
+    """
+    Write a DataFrame with 'date' (and optionally 'location') columns into
+    year/location partitions of typed .npy columns, replacing the dataset
+    """
+    spec = DATASETS[dataset]
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    if 'location' not in df.columns:
+        df['location'] = DEFAULT_LOCATION
+    df['location'] = df['location'].fillna(DEFAULT_LOCATION).astype(str)
+    df = df.sort_values(['location', 'date'])
+
+    target = _dataset_path(dataset)
+    previous = load_manifest(dataset)
+    version = f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+    # Locations keep their slugs across rewrites (model artifacts are named by them)
+    locations = df['location'].unique()
+    kept = {loc: slug for loc, slug in _manifest_slugs(previous).items() if loc in set(locations)} if previous else {}
+    slugs = assign_slugs(locations, kept)
+
+    partitions = []
+    years = df['date'].dt.year
+    for (location, year), part in df.groupby([df['location'], years], sort=True):
+        slug = slugs[location]
+        relative_dir = os.path.join(version, f'location={slug}', f'year={year}')
+        entry = _write_partition(part, spec, os.path.join(target, relative_dir), location, slug, year)
+        entry['dir'] = relative_dir
+        partitions.append(entry)
+
+    manifest = {
+        'dataset': dataset,
+        'columns': {c: t for c, t in spec['columns'].items() if c in df.columns},
+        'rows': len(df),
+        'slugs': slugs,
+        'partitions': partitions,
+        'ingested_at': datetime.utcnow().isoformat()
+    }
+    os.makedirs(target, exist_ok=True)
+    # The manifest swap is the commit point: the dataset directory always
+    # exists and readers see either the old partitions or the new ones
+    _commit_manifest(dataset, manifest)
+
+    _remove_unreferenced(dataset, _partition_dirs(manifest) | (_partition_dirs(previous) if previous else set()))
+
+    for callback in _ingest_listeners:
+        callback(dataset)
+
+    return manifest
+
+def ingest_raw_data(datasets=None):
+    """
+    Convert the raw CSVs under Config.DATA_PATH/raw into the columnar store
+    """
+    results = {}
+    for dataset in datasets or DATASETS:
+        source = os.path.join(Config.DATA_PATH, 'raw', DATASETS[dataset]['source'])
+        if not os.path.exists(source):
+            results[dataset] = None
+            continue
+        df = pd.read_csv(source)
+        results[dataset] = write_partitions(df, dataset)
+    return results
+
+def append_partitions(df, dataset):
+    """
+    Merge new rows into an ingested dataset, rewriting only the
+    location/year partitions they touch (rows for an existing date replace
+    the stored ones). Columns missing from df keep their stored values for
+    replaced dates and are NaN for new ones. Falls back to a full write if
+    nothing is ingested yet.
+    """
+    manifest = load_manifest(dataset)
+    if manifest is None:
+        return write_partitions(df, dataset)
+
+    spec = DATASETS[dataset]
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    if 'location' not in df.columns:
+        df['location'] = DEFAULT_LOCATION
+    df['location'] = df['location'].fillna(DEFAULT_LOCATION).astype(str)
+
+    columns = list(manifest['columns'])
+    # Every partition must hold every manifest column, or reads of it fail
+    missing = [c for c in columns if c not in df.columns]
+    df = df.reindex(columns=['date', 'location'] + columns)
+    previous_dirs = _partition_dirs(manifest)
+    version = f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+    slugs = assign_slugs(sorted(df['location'].unique()), _manifest_slugs(manifest))
+    by_key = {(p['slug'], p['year']): p for p in manifest['partitions']}
+
+    for (location, year), new_rows in df.groupby([df['location'], df['date'].dt.year], sort=True):
+        slug = slugs[location]
+        existing = by_key.get((slug, int(year)))
+        if existing is not None:
+            old_rows = _read_partition(dataset, existing, columns, None, None)
+            if missing:
+                kept = new_rows[['date']].merge(old_rows[['date'] + missing], on='date', how='left')
+                new_rows = new_rows.assign(**{c: kept[c].values for c in missing})
+            new_rows = pd.concat([old_rows, new_rows])
+            new_rows = new_rows.drop_duplicates('date', keep='last').sort_values('date')
+
+        relative_dir = os.path.join(version, f'location={slug}', f'year={year}')
+        entry = _write_partition(new_rows, spec, os.path.join(_dataset_path(dataset), relative_dir),
+                                 location, slug, year)
+        entry['dir'] = relative_dir
+        by_key[(slug, int(year))] = entry
+
+    manifest['slugs'] = slugs
+    manifest['partitions'] = sorted(by_key.values(), key=lambda p: (p['slug'], p['year']))
+    manifest['rows'] = sum(p['rows'] for p in manifest['partitions'])
+    manifest['ingested_at'] = datetime.utcnow().isoformat()
+
+    # The manifest swap is the commit point for readers; superseded
+    # partitions are removed by the next write, not under their feet
+    _commit_manifest(dataset, manifest)
+    _remove_unreferenced(dataset, _partition_dirs(manifest) | previous_dirs)
+
+    for callback in _ingest_listeners:
+        callback(dataset)
+
+    return manifest
+
+def load_manifest(dataset):
+    """
+    Load the manifest of an ingested dataset, or None if it was never ingested
+    """
+    try:
+        with open(os.path.join(_dataset_path(dataset), '_manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def dataset_signature(dataset):
+    """
+    (mtime_ns, size) of a dataset's manifest, which is rewritten on every
+    ingest or append; None if the dataset was never ingested
+    """
+    try:
+        stat = os.stat(os.path.join(_dataset_path(dataset), '_manifest.json'))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _read_partition(dataset, partition, columns, start, end):
+    """
+    Read the requested columns of one partition, sliced to [start, end]
+    """
+    part_dir = _partition_dir(dataset, partition)
+    dates = np.load(os.path.join(part_dir, 'date.npy'), mmap_mode='r')
+    lo = 0 if start is None else int(np.searchsorted(dates, start, side='left'))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, end, side='right'))
+
+    frame = {'date': np.asarray(dates[lo:hi]).astype('datetime64[ns]')}
+    for column in columns:
+        values = np.load(os.path.join(part_dir, f'{column}.npy'), mmap_mode='r')
+        frame[column] = np.array(values[lo:hi])
+    frame['location'] = partition['location']
+    return pd.DataFrame(frame)
+
+def _empty_frame(columns):
+    return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'),
+                         **{c: pd.Series(dtype='float64') for c in columns},
+                         'location': pd.Series(dtype='object')})
+
+def load_range(dataset, start=None, end=None, location=None, columns=None):
+    """
+    Load rows of a dataset between start and end (inclusive), reading only
+    the partitions and columns needed. Returns None if not ingested.
+    """
+    manifest = load_manifest(dataset)
+    if manifest is None:
+        return None
+
+    columns = list(columns or manifest['columns'])
+    start_day = np.datetime64(pd.Timestamp(start).date(), 'D') if start is not None else None
+    end_day = np.datetime64(pd.Timestamp(end).date(), 'D') if end is not None else None
+    slug = _location_slug(manifest, location) if location is not None else None
+
+    frames = []
+    for partition in manifest['partitions']:
+        if slug is not None and partition['slug'] != slug:
+            continue
+        if start_day is not None and np.datetime64(partition['end']) < start_day:
+            continue
+        if end_day is not None and np.datetime64(partition['start']) > end_day:
+            continue
+        frames.append(_read_partition(dataset, partition, columns, start_day, end_day))
+
+    if not frames:
+        return _empty_frame(columns)
+
+    df = pd.concat(frames, ignore_index=True)
+    if len(frames) > 1:
+        df = df.sort_values(['date', 'location'], kind='stable', ignore_index=True)
+    return df
+
+def load_recent(dataset, n_rows, location=None, columns=None):
+    """
+    Load the last n_rows of a dataset for one location, reading partitions
+    newest-first and stopping as soon as enough rows are collected.
+    Returns None if not ingested and an empty frame for unknown locations.
+    """
+    manifest = load_manifest(dataset)
+    if manifest is None:
+        return None
+
+    columns = list(columns or manifest['columns'])
+    if location is not None:
+        slug = _location_slug(manifest, location)
+    else:
+        slugs = {p['slug'] for p in manifest['partitions']}
+        slug = slugs.pop() if len(slugs) == 1 else DEFAULT_LOCATION
+    partitions = sorted((p for p in manifest['partitions'] if p['slug'] == slug),
+                        key=lambda p: p['year'], reverse=True)
+
+    frames, collected = [], 0
+    for partition in partitions:
+        frames.append(_read_partition(dataset, partition, columns, None, None))
+        collected += partition['rows']
+        if collected >= n_rows:
+            break
+
+    if not frames:
+        # No default market in a multi-market store: let the caller fall back
+        return _empty_frame(columns) if location is not None else None
+    df = pd.concat(frames[::-1], ignore_index=True)
+    return df.tail(n_rows).reset_index(drop=True)
+
+def load_prices(start=None, end=None, location=None):
+    """
+    Load ginger prices for a date range from the columnar store
+    """
+    return load_range('prices', start, end, location, columns=['price'])
+
+def load_weather(start=None, end=None, location=None, columns=None):
+    """
+    Load weather observations for a date range from the columnar store
+    """
+    return load_range('weather', start, end, location, columns=columns)
+
+if __name__ == '__main__':
+    for name, manifest in ingest_raw_data().items():
+        if manifest is None:
+            print(f"{name}: no raw CSV found, skipped")
+        else:
+            print(f"{name}: {manifest['rows']} rows in {len(manifest['partitions'])} partitions")
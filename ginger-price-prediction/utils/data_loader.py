@@ -1,15 +1,146 @@
+import numpy as np
 import pandas as pd
 import os
+import threading
 from config import Config
+from utils.metrics import timed, record_error, register_collector, cache_samples
+from utils.synthetic_data import generate_datasets
+
+# Parsed datasets keyed by source path: {path: (signature, DataFrame)}
+_dataset_cache = {}
+_dataset_cache_lock = threading.Lock()
+_dataset_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+def _file_signature(data_path):
+    """
+    Return (mtime_ns, size) for a file, or None if it does not exist
+    """
+    try:
+        stat = os.stat(data_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _read_only(df):
+    """
+    Rebuild a parsed frame on read-only column arrays, so an in-place write
+    through any shallow copy raises instead of changing the cached frame
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, np.dtype):
+            values = values.to_numpy(copy=True)
+            values.flags.writeable = False
+        columns[column] = values.array if isinstance(values, pd.Series) else values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+def _load_cached(data_path, parser):
+    """
+    Return a shallow copy of a parsed dataset, re-parsing only when the
+    source file's mtime or size has changed since the last load
+
+    The cached frame's NumPy columns are read-only: callers may add or
+    reassign columns on their copy, but writing values in place raises
+    until they .copy() it.
+    """
+    signature = _file_signature(data_path)
+    
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(data_path)
+        if entry is not None and entry[0] == signature:
+            _dataset_cache_stats['hits'] += 1
+            return entry[1].copy(deep=False)
+        
+        if entry is not None:
+            _dataset_cache_stats['invalidations'] += 1
+        _dataset_cache_stats['misses'] += 1
+        
+        # Parse while holding the lock so concurrent cold requests share one read
+        with timed('dataset_load'):
+            df = _read_only(parser(data_path))
+        _dataset_cache[data_path] = (signature, df)
+        return df.copy(deep=False)
+
+def get_dataset_cache_stats():
+    """
+    Get hit/miss counters and resident entries of the dataset cache
+    """
+    with _dataset_cache_lock:
+        stats = dict(_dataset_cache_stats)
+        stats['entries'] = len(_dataset_cache)
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+    return stats
+
+register_collector(lambda: cache_samples('dataset', get_dataset_cache_stats(),
+                                         ('hits', 'misses', 'invalidations')))
+
+def clear_dataset_cache():
+    """
+    Drop all cached datasets so the next load re-reads the source files
+    """
+    with _dataset_cache_lock:
+        _dataset_cache.clear()
+
+def historical_data_path():
+    return os.path.join(Config.DATA_PATH, 'raw', 'harga_jahe_2020_2024.csv')
+
+def weather_data_path():
+    return os.path.join(Config.DATA_PATH, 'raw', 'data_cuaca_2020_2024.csv')
+
+def get_source_signatures():
+    """
+    (mtime_ns, size) of the price and weather source files, None if missing
+    """
+    return {
+        'prices': _file_signature(historical_data_path()),
+        'weather': _file_signature(weather_data_path())
+    }
 
 def load_historical_data():
     """
     Load historical ginger price data from CSV file
     """
+    return _load_cached(historical_data_path(), _parse_historical_data)
+
+def load_recent_prices(n_days=30, location=None):
+    """
+    Load the most recent n_days of prices, preferring the columnar store
+    and falling back to the full CSV when it has not been ingested yet
+    (see price_series for what location None means)
+    """
+    from utils.columnar_store import load_recent
+    
+    try:
+        df = load_recent('prices', n_days, location=location, columns=['price'])
+        if df is not None:
+            return df
+    except Exception as e:
+        print(f"Error reading columnar price store: {str(e)}")
+    
+    df = price_series(load_historical_data(), location)
+    return df.tail(n_days).reset_index(drop=True)
+
+def price_series(df, location=None):
+    """
+    One price series in date order: the given market's rows or, for
+    location None on data covering several markets, the daily mean across
+    them, so a window never mixes markets
+    """
+    if 'location' not in df.columns:
+        return df
+    if location is not None:
+        return df[df['location'] == location].reset_index(drop=True)
+    if df['location'].nunique() > 1:
+        return df.groupby('date', as_index=False, sort=True)['price'].mean()
+    return df
+
+def _parse_historical_data(data_path):
+    """
+    Parse the historical price CSV, falling back to sample data
+    """
     try:
-        # Path to the raw data file
-        data_path = os.path.join(Config.DATA_PATH, 'raw', 'harga_jahe_2020_2024.csv')
-        
         # Check if file exists
         if not os.path.exists(data_path):
             # Return sample data if file doesn't exist
@@ -38,49 +169,45 @@ def load_historical_data():
     
     except Exception as e:
         print(f"Error loading historical data: {str(e)}")
+        record_error('dataset_load')
         return create_sample_data()
 
+def load_backtest_results():
+    """
+    Load the precomputed walk-forward backtest table (empty if never run)
+    """
+    return _load_cached(Config.BACKTEST_RESULTS_PATH, _parse_backtest_results)
+
+def _parse_backtest_results(data_path):
+    """
+    Parse the backtest results CSV written by models.backtest
+    """
+    try:
+        if os.path.exists(data_path):
+            return pd.read_csv(data_path)
+    except Exception as e:
+        print(f"Error loading backtest results: {str(e)}")
+    return pd.DataFrame(columns=['model_type', 'location', 'horizon', 'origins',
+                                 'mae', 'rmse', 'mape', 'computed_at'])
+
 def create_sample_data():
     """
-    Create sample data for demonstration purposes
+    Create sample data for demonstration purposes (the last 365 days,
+    reproducible through Config.SAMPLE_DATA_SEED)
     """
-    import pandas as pd
-    from datetime import datetime, timedelta
-    import numpy as np
-    
-    # Generate sample dates for the last 12 months
-    dates = []
-    prices = []
-    
-    start_date = datetime.now() - timedelta(days=365)
-    for i in range(365):
-        current_date = start_date + timedelta(days=i)
-        dates.append(current_date)
-        
-        # Generate somewhat realistic price data with trend and seasonality
-        base_price = 25000
-        trend = i * 10  # Slight upward trend
-        seasonal = 3000 * np.sin(2 * np.pi * i / 365.25 * 2)  # Seasonal variation
-        noise = np.random.normal(0, 1000)  # Random noise
-        
-        price = base_price + trend + seasonal + noise
-        prices.append(max(price, 10000))  # Ensure minimum price
-    
-    df = pd.DataFrame({
-        'date': dates,
-        'price': prices
-    })
-    
-    return df
+    return generate_datasets()['prices']
 
 def load_weather_data():
     """
     Load weather data that affects ginger prices
     """
+    return _load_cached(weather_data_path(), _parse_weather_data)
+
+def _parse_weather_data(data_path):
+    """
+    Parse the weather CSV, falling back to sample data
+    """
     try:
-        # Path to the weather data file
-        data_path = os.path.join(Config.DATA_PATH, 'raw', 'data_cuaca_2020_2024.csv')
-        
         # Check if file exists
         if not os.path.exists(data_path):
             # Return sample weather data if file doesn't exist
@@ -109,50 +236,12 @@ def load_weather_data():
     
     except Exception as e:
         print(f"Error loading weather data: {str(e)}")
+        record_error('dataset_load')
         return create_sample_weather_data()
 
 def create_sample_weather_data():
     """
-    Create sample weather data for demonstration purposes
+    Create sample weather data for demonstration purposes, generated with
+    the same seed as the sample prices so the two are correlated
     """
-    import pandas as pd
-    from datetime import datetime, timedelta
-    import numpy as np
-    
-    # Generate sample dates for the last 12 months
-    dates = []
-    temperatures = []
-    rainfalls = []
-    humidities = []
-    
-    start_date = datetime.now() - timedelta(days=365)
-    for i in range(365):
-        current_date = start_date + timedelta(days=i)
-        dates.append(current_date)
-        
-        # Generate somewhat realistic weather data
-        base_temp = 28  # Base temperature in Celsius
-        temp_seasonal = 5 * np.sin(2 * np.pi * i / 365.25)  # Seasonal temperature variation
-        temp_noise = np.random.normal(0, 2)  # Random temperature noise
-        temp = base_temp + temp_seasonal + temp_noise
-        temperatures.append(max(temp, 15))  # Ensure minimum temperature
-        
-        # Rainfall with seasonal pattern
-        base_rain = 20  # Base rainfall in mm
-        rain_seasonal = 30 * np.sin(2 * np.pi * i / 365.25 * 2 + np.pi)  # Rainy season pattern
-        rain_noise = np.random.exponential(5)  # Random rainfall noise (exponential for occasional heavy rain)
-        rain = max(base_rain + rain_seasonal + rain_noise, 0)
-        rainfalls.append(rain)
-        
-        # Humidity based on temperature and rainfall
-        humidity = 60 + (28 - temp) * 1.5 + (rain - 20) * 0.5 + np.random.normal(0, 5)
-        humidities.append(max(min(humidity, 100), 30))  # Keep between 30% and 100%
-    
-    df = pd.DataFrame({
-        'date': dates,
-        'temperature': temperatures,
-        'rainfall': rainfalls,
-        'humidity': humidities
-    })
-    
-    return df
\ No newline at end of file
+    return generate_datasets()['weather']
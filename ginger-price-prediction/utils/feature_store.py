@@ -0,0 +1,316 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import Config
+from utils.metrics import timed, register_collector, cache_samples
+from utils.data_loader import load_historical_data, load_weather_data, get_source_signatures, price_series
+
+_feature_cache = {'fingerprint': None, 'features': None}
+_feature_cache_lock = threading.Lock()
+_feature_stats = {'hits': 0, 'disk_hits': 0, 'builds': 0}
+# Per-market training matrices keyed by _training_key
+_training_cache = OrderedDict()
+_TRAINING_CACHE_SIZE = 32
+
+def _content_digest(df):
+    """
+    Hash of a frame's values, used when a source has no file to stat
+    (the generated sample data)
+    """
+    sha = hashlib.sha256()
+    for column in df.columns:
+        sha.update(column.encode())
+        sha.update(pd.util.hash_pandas_object(df[column], index=False).values.tobytes())
+    return sha.hexdigest()[:16]
+
+def _params():
+    return {
+        'lags': list(Config.FEATURE_LAGS),
+        'rain_windows': list(Config.FEATURE_RAIN_WINDOWS),
+        'anomaly_window': Config.FEATURE_ANOMALY_WINDOW,
+        'tolerance_days': Config.FEATURE_ASOF_TOLERANCE_DAYS
+    }
+
+def feature_fingerprint(prices, weather):
+    """
+    Key of the feature matrix: the source files' signatures (or their
+    content when there is no file) plus the feature parameters
+    """
+    signatures = get_source_signatures()
+    key = {
+        'prices': list(signatures['prices']) if signatures['prices'] else _content_digest(prices),
+        'weather': list(signatures['weather']) if signatures['weather'] else _content_digest(weather),
+        'params': _params()
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+def _group_day_keys(df):
+    """
+    Sortable int64 key per row: location code in the high digits, day number
+    in the low ones, so trailing windows never reach into another location
+    """
+    days = df['date'].values.astype('datetime64[D]').astype(np.int64)
+    if 'location' not in df.columns:
+        return days
+    codes, _ = pd.factorize(df['location'], sort=True)
+    return codes.astype(np.int64) * 10_000_000 + days
+
+def _trailing_sum(keys, values, window):
+    """
+    Sum of values over the trailing `window` days (inclusive) for every row
+    of a frame sorted by keys, via one cumulative sum and a binary search
+    """
+    csum = np.concatenate([[0.0], np.cumsum(values)])
+    start = np.searchsorted(keys, keys - window, side='right')
+    return csum[1:] - csum[start]
+
+def _weather_features(weather, rain_windows, anomaly_window):
+    """
+    Rolling rain totals and the temperature anomaly against its trailing
+    mean, computed per location on the weather calendar
+    """
+    sort_by = ['location', 'date'] if 'location' in weather.columns else ['date']
+    weather = weather.sort_values(sort_by).drop_duplicates(sort_by, keep='last').reset_index(drop=True)
+    keys = _group_day_keys(weather)
+
+    rain = weather['rainfall'].fillna(0).values.astype(np.float64)
+    for window in rain_windows:
+        weather[f'rain_{window}d'] = _trailing_sum(keys, rain, window)
+
+    temperature = weather['temperature'].values.astype(np.float64)
+    observed = ~np.isnan(temperature)
+    total = _trailing_sum(keys, np.where(observed, temperature, 0.0), anomaly_window)
+    count = _trailing_sum(keys, observed.astype(np.float64), anomaly_window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weather['temp_anomaly'] = temperature - total / count
+
+    return weather
+
+def build_feature_frame(prices, weather, lags=None, rain_windows=None, anomaly_window=None,
+                        tolerance_days=None):
+    """
+    Align prices with weather and derive the model features
+
+    Each price row takes the latest weather reading for its location on or
+    before its date (as-of join, at most tolerance_days old). Lags are in
+    rows of the location's price series. Rows missing any feature (lag
+    warm-up, no weather in reach) are dropped.
+    """
+    lags = Config.FEATURE_LAGS if lags is None else lags
+    rain_windows = Config.FEATURE_RAIN_WINDOWS if rain_windows is None else rain_windows
+    anomaly_window = Config.FEATURE_ANOMALY_WINDOW if anomaly_window is None else anomaly_window
+    tolerance_days = Config.FEATURE_ASOF_TOLERANCE_DAYS if tolerance_days is None else tolerance_days
+
+    price_locations = 'location' in prices.columns
+    by_location = price_locations and 'location' in weather.columns
+    weather = weather[['date', 'temperature', 'humidity', 'rainfall']
+                      + (['location'] if 'location' in weather.columns else [])].copy()
+    if 'location' in weather.columns and not by_location:
+        # No per-market prices to match: use the daily mean over weather stations
+        weather = weather.groupby('date', as_index=False)[['temperature', 'humidity', 'rainfall']].mean()
+    weather = _weather_features(weather, rain_windows, anomaly_window)
+
+    prices = prices[['date', 'price'] + (['location'] if price_locations else [])].copy()
+    prices = prices.sort_values(['location', 'date'] if price_locations else ['date']).reset_index(drop=True)
+    grouped = prices.groupby('location')['price'] if price_locations else prices['price']
+    for lag in lags:
+        prices[f'price_lag_{lag}'] = grouped.shift(lag)
+
+    frame = pd.merge_asof(
+        prices.sort_values('date', kind='stable'), weather.sort_values('date', kind='stable'), on='date',
+        by='location' if by_location else None, direction='backward',
+        tolerance=pd.Timedelta(days=tolerance_days)
+    )
+    if price_locations:
+        frame = frame.sort_values(['location', 'date'], kind='stable')
+    return frame.dropna().reset_index(drop=True)
+
+def _correlations(matrix, columns):
+    """
+    Pearson correlation of every feature with price (column 0)
+    """
+    if len(matrix) < 2:
+        return {column: None for column in columns[1:]}
+    values = matrix.astype(np.float64)
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (centered.T @ centered[:, 0]) / (norms * norms[0])
+    return {column: (round(float(value), 4) if np.isfinite(value) else None)
+            for column, value in zip(columns[1:], r[1:])}
+
+def _to_features(frame, fingerprint):
+    columns = ['price'] + [c for c in frame.columns if c not in ('date', 'location', 'price')]
+    matrix = np.ascontiguousarray(frame[columns].values, dtype=np.float32)
+    return {
+        'fingerprint': fingerprint,
+        'columns': columns,
+        'matrix': matrix,
+        'dates': frame['date'].values.astype('datetime64[ns]'),
+        'locations': frame['location'].to_numpy(dtype=str) if 'location' in frame.columns else None,
+        'correlations': _correlations(matrix, columns)
+    }
+
+def _feature_file(fingerprint):
+    return os.path.join(Config.FEATURE_STORE_PATH, f'features-{fingerprint}.npz')
+
+def _save_features(features):
+    """
+    Write the matrix to FEATURE_STORE_PATH, replacing older versions
+    """
+    os.makedirs(Config.FEATURE_STORE_PATH, exist_ok=True)
+    path = _feature_file(features['fingerprint'])
+    arrays = {'matrix': features['matrix'], 'columns': np.array(features['columns']),
+              'dates': features['dates']}
+    if features['locations'] is not None:
+        arrays['locations'] = features['locations'].astype(str)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+    for old in glob.glob(os.path.join(Config.FEATURE_STORE_PATH, 'features-*.npz')):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+def _load_features(fingerprint):
+    path = _feature_file(fingerprint)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        columns = [str(c) for c in npz['columns']]
+        matrix = npz['matrix']
+        return {
+            'fingerprint': fingerprint,
+            'columns': columns,
+            'matrix': matrix,
+            'dates': npz['dates'],
+            'locations': npz['locations'] if 'locations' in npz.files else None,
+            'correlations': _correlations(matrix, columns)
+        }
+
+def _filter_location(features, location):
+    if location is None or features['locations'] is None:
+        return features
+    mask = features['locations'] == location
+    filtered = dict(features)
+    filtered['matrix'] = features['matrix'][mask]
+    filtered['dates'] = features['dates'][mask]
+    filtered['locations'] = features['locations'][mask]
+    filtered['correlations'] = _correlations(filtered['matrix'], features['columns'])
+    return filtered
+
+def get_feature_set(location=None):
+    """
+    Get the aligned float32 feature matrix (price in column 0)
+
+    The matrix is rebuilt only when a source file or a feature setting
+    changes; otherwise it comes from memory or, in a fresh process, from
+    the copy saved under FEATURE_STORE_PATH. Sample data (no source file)
+    is kept in memory only.
+    """
+    prices = load_historical_data()
+    weather = load_weather_data()
+    fingerprint = feature_fingerprint(prices, weather)
+
+    with _feature_cache_lock:
+        if _feature_cache['fingerprint'] == fingerprint:
+            _feature_stats['hits'] += 1
+            return _filter_location(_feature_cache['features'], location)
+
+        persist = all(get_source_signatures().values())
+        features = None
+        if persist:
+            try:
+                features = _load_features(fingerprint)
+            except Exception as e:
+                print(f"Error reading feature store: {str(e)}")
+        if features is not None:
+            _feature_stats['disk_hits'] += 1
+        else:
+            _feature_stats['builds'] += 1
+            with timed('feature_build'):
+                features = _to_features(build_feature_frame(prices, weather), fingerprint)
+            if persist:
+                try:
+                    _save_features(features)
+                except Exception as e:
+                    print(f"Error saving feature store: {str(e)}")
+
+        _feature_cache['fingerprint'] = fingerprint
+        _feature_cache['features'] = features
+        return _filter_location(features, location)
+
+def get_feature_stats():
+    """
+    Hit/build counters of the feature matrix cache
+    """
+    with _feature_cache_lock:
+        return dict(_feature_stats, fingerprint=_feature_cache['fingerprint'])
+
+register_collector(lambda: cache_samples('features', _feature_stats, ('hits', 'disk_hits', 'builds')))
+
+def weather_feature_columns(columns):
+    """
+    Features a recurrent model can take alongside its price window: the
+    weather-derived ones (price lags already live in the window)
+    """
+    return [c for c in columns if c != 'price' and not c.startswith('price_lag_')]
+
+def _training_key(prices, weather):
+    signature = get_source_signatures()['weather']
+    key = {
+        'prices': _content_digest(prices),
+        'weather': list(signature) if signature else _content_digest(weather),
+        'params': _params()
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+def get_training_features(prices, location=None):
+    """
+    Aligned price series and weather features for the trainer, built from
+    the given price rows
+
+    location picks one market's rows (see price_series); on data covering
+    several markets, None trains on the daily mean price against the daily
+    mean weather, so no window ever spans two markets. Results are cached
+    by the rows' content, the weather source and the feature settings.
+
+    Returns {'prices': float64 (n,), 'exog': float32 (n, k), 'exog_columns': [...]}
+    where exog row t is the weather known on the day of price t.
+    """
+    series = price_series(prices, location)
+    weather = load_weather_data()
+    key = _training_key(series, weather)
+
+    with _feature_cache_lock:
+        if key in _training_cache:
+            _training_cache.move_to_end(key)
+            _feature_stats['hits'] += 1
+            return _training_cache[key]
+
+    with timed('feature_build'):
+        features = _to_features(build_feature_frame(series, weather), key)
+    exog_columns = weather_feature_columns(features['columns'])
+    exog_index = [features['columns'].index(c) for c in exog_columns]
+    result = {
+        'prices': features['matrix'][:, 0].astype(np.float64),
+        'exog': features['matrix'][:, exog_index],
+        'exog_columns': exog_columns
+    }
+
+    with _feature_cache_lock:
+        _feature_stats['builds'] += 1
+        _training_cache[key] = result
+        while len(_training_cache) > _TRAINING_CACHE_SIZE:
+            _training_cache.popitem(last=False)
+    return result
@@ -0,0 +1,318 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Counters and fixed-bucket histograms are plain dicts behind one lock, so
+recording costs a bisect and an increment. Each gunicorn worker keeps its
+own numbers; when Config.METRICS_DIR is set every worker also snapshots them
+to <METRICS_DIR>/metrics-<pid>-<start>.json every METRICS_FLUSH_INTERVAL
+seconds (and on exit), and whichever worker answers /metrics sums the
+snapshots, so a single scrape covers the whole server.
+
+As with prometheus_client's multiprocess mode, counters and histograms of
+exited workers stay in the sum so totals never go down (which Prometheus
+would read as a reset); only gauges age out after METRICS_STALE_SECONDS.
+Clear METRICS_DIR when the server (not a worker) starts.
+"""
+
+import atexit
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+# name -> {'type', 'help', 'labels', 'buckets', 'values': {label values: value}}
+_metrics = {}
+# Callables returning [(name, type, help, labels dict, value)] read at scrape time
+_collectors = []
+_flusher = {'pid': None, 'path': None}
+_sqlalchemy_instrumented = []
+
+def _register(name, metric_type, help_text, labelnames, buckets=None):
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = {'type': metric_type, 'help': help_text, 'labels': tuple(labelnames),
+                              'buckets': tuple(buckets) if buckets else None, 'values': {}}
+    return name
+
+def counter(name, help_text, labelnames=()):
+    return _register(name, 'counter', help_text, labelnames)
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(name, 'histogram', help_text, labelnames, buckets)
+
+def inc(name, labels=(), amount=1):
+    """
+    Add amount to a counter; labels are values in labelnames order
+    """
+    labels = tuple(str(value) for value in labels)
+    with _lock:
+        values = _metrics[name]['values']
+        values[labels] = values.get(labels, 0) + amount
+
+def observe(name, value, labels=()):
+    """
+    Record one observation in a histogram
+    """
+    labels = tuple(str(label) for label in labels)
+    metric = _metrics[name]
+    index = bisect.bisect_left(metric['buckets'], value)
+    with _lock:
+        entry = metric['values'].get(labels)
+        if entry is None:
+            entry = metric['values'][labels] = [[0] * (len(metric['buckets']) + 1), 0.0, 0]
+        entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+
+REQUEST_LATENCY = histogram('ginger_http_request_duration_seconds',
+                            'Time to produce a response, per endpoint', ('endpoint', 'method', 'status'))
+STAGE_LATENCY = histogram('ginger_stage_duration_seconds',
+                          'Time spent in internal stages', ('stage',))
+STAGE_ERRORS = counter('ginger_stage_errors_total',
+                       'Failures inside internal stages, including ones answered with a fallback', ('stage',))
+UPSTREAM_REQUESTS = counter('ginger_upstream_requests_total',
+                            'Calls to external services by outcome', ('upstream', 'outcome'))
+
+@contextmanager
+def timed(stage):
+    """
+    Time a block as an internal stage; exceptions are counted and re-raised
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc(STAGE_ERRORS, (stage,))
+        raise
+    finally:
+        observe(STAGE_LATENCY, time.perf_counter() - started, (stage,))
+
+def timed_stage(stage):
+    """
+    Decorator form of timed()
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_error(stage):
+    """
+    Count a failure that was handled (logged and answered with a fallback)
+    """
+    inc(STAGE_ERRORS, (stage,))
+
+def register_collector(collector):
+    """
+    Register collector() -> [(name, type, help, labels dict, value)], read at
+    scrape time; used to export the counters caches already keep
+    """
+    _collectors.append(collector)
+
+def cache_samples(cache, stats, keys):
+    """
+    Collector samples for a cache's hit/miss style counters
+    """
+    return [('ginger_cache_events_total', 'counter', 'Cache lookups and maintenance events by cache',
+             {'cache': cache, 'event': key}, stats.get(key, 0)) for key in keys]
+
+def snapshot():
+    """
+    JSON-serializable copy of this process's metrics, collectors included
+    """
+    with _lock:
+        state = {
+            name: {'type': m['type'], 'help': m['help'], 'labels': list(m['labels']),
+                   'buckets': list(m['buckets']) if m['buckets'] else None,
+                   'values': [[list(labels), value if m['type'] == 'counter' else [list(value[0]), value[1], value[2]]]
+                              for labels, value in m['values'].items()]}
+            for name, m in _metrics.items()
+        }
+    for collector in _collectors:
+        try:
+            samples = collector()
+        except Exception as e:
+            print(f"Error collecting metrics: {str(e)}")
+            continue
+        for name, metric_type, help_text, labels, value in samples:
+            metric = state.setdefault(name, {'type': metric_type, 'help': help_text, 'labels': list(labels),
+                                             'buckets': None, 'values': []})
+            metric['values'].append([[str(labels[k]) for k in metric['labels']], value])
+    return state
+
+def _merge(total, state):
+    for name, metric in state.items():
+        merged = total.setdefault(name, dict(metric, values={}))
+        for labels, value in metric['values']:
+            key = tuple(labels)
+            if metric['type'] == 'histogram':
+                current = merged['values'].get(key)
+                if current is None:
+                    merged['values'][key] = [list(value[0]), value[1], value[2]]
+                else:
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+            else:
+                merged['values'][key] = merged['values'].get(key, 0) + value
+    return total
+
+def flush():
+    """
+    Write this worker's snapshot to METRICS_DIR (atomically)
+    """
+    os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    path = _flusher['path']
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp_path, path)
+
+def _ensure_flusher():
+    """
+    Start the snapshot thread once per worker process (after any fork)
+    """
+    if not Config.METRICS_DIR or _flusher['pid'] == os.getpid():
+        return
+    _flusher['pid'] = os.getpid()
+    # The start time keeps a later worker that reuses this pid from
+    # overwriting the totals this one leaves behind
+    _flusher['path'] = os.path.join(Config.METRICS_DIR, f'metrics-{os.getpid()}-{time.time_ns()}.json')
+
+    def run():
+        while True:
+            time.sleep(Config.METRICS_FLUSH_INTERVAL)
+            try:
+                flush()
+            except Exception as e:
+                print(f"Error flushing metrics: {str(e)}")
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+    # Counts recorded since the last periodic flush would otherwise be lost
+    atexit.register(flush)
+
+def _counts_only(state):
+    return {name: metric for name, metric in state.items() if metric['type'] in ('counter', 'histogram')}
+
+def collect():
+    """
+    Metrics of this worker plus, with METRICS_DIR, the counters and
+    histograms of every other worker, live or exited, and the gauges of
+    those that wrote a snapshot within METRICS_STALE_SECONDS
+    """
+    total = _merge({}, snapshot())
+    if Config.METRICS_DIR:
+        own = _flusher['path'] if _flusher['pid'] == os.getpid() else None
+        cutoff = time.time() - Config.METRICS_STALE_SECONDS
+        for path in glob.glob(os.path.join(Config.METRICS_DIR, 'metrics-*.json')):
+            if path == own:
+                continue
+            try:
+                stale = os.path.getmtime(path) < cutoff
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            _merge(total, _counts_only(state) if stale else state)
+    return total
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(metrics=None):
+    """
+    Prometheus text exposition format (version 0.0.4)
+    """
+    metrics = collect() if metrics is None else metrics
+    lines = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['values'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(metric['labels'], labels)} {_format_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric['buckets']) + [float('inf')], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(metric['labels'], labels, ('le', _format_number(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(metric['labels'], labels)} {_format_number(total)}")
+            lines.append(f"{name}_count{_format_labels(metric['labels'], labels)} {count}")
+    return '\n'.join(lines) + '\n'
+
+def _instrument_sqlalchemy():
+    """
+    Time every DB statement as the db_query stage
+    """
+    if _sqlalchemy_instrumented:
+        return
+    _sqlalchemy_instrumented.append(True)
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        observe(STAGE_LATENCY, time.perf_counter() - conn.info['metrics_query_start'].pop(), ('db_query',))
+
+    @event.listens_for(Engine, 'handle_error')
+    def handle_error(context):
+        starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+        record_error('db_query')
+
+def init_app(app):
+    """
+    Record per-endpoint latency for every request and serve /metrics
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_timer():
+        _ensure_flusher()
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None and request.endpoint != 'metrics':
+            # Streamed bodies are timed to the first byte
+            observe(REQUEST_LATENCY, time.perf_counter() - started,
+                    (request.endpoint or 'unmatched', request.method, response.status_code))
+        return response
+
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
+    _instrument_sqlalchemy()
+    return app
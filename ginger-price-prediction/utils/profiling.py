@@ -0,0 +1,198 @@
+"""
+Opt-in per-request profiling
+
+A request is profiled when it carries a valid signed PROFILE_HEADER token or
+is picked by PROFILE_SAMPLE_RATE. The profile of that one request is written
+to PROFILE_DIR together with a JSON sidecar holding the route, status and
+timing:
+
+- 'sampling' mode (default): a helper thread samples the request thread's
+  stack every PROFILE_SAMPLE_INTERVAL seconds and writes collapsed stacks
+  (.folded), ready for flamegraph.pl or speedscope.
+- 'cprofile' mode: a deterministic cProfile dump (.prof) for pstats/snakeviz.
+
+When neither a secret nor a sample rate is configured, init_app registers
+no hooks at all, so disabled profiling costs nothing per request.
+"""
+
+import argparse
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from config import Config
+
+class StackSampler:
+    """
+    Sample one thread's Python stack at a fixed interval from a helper thread
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        own_frame = sys._getframe()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not own_frame:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(self.stacks.values())
+
+class _CProfiler:
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+        return self
+
+    def stop(self):
+        self._profile.disable()
+
+    def write(self, path):
+        self._profile.dump_stats(path)
+        return None
+
+def sign_profile_token(secret=None, timestamp=None):
+    """
+    Header value that turns profiling on for one request: '<unix time>:<hmac>'
+    """
+    secret = secret or Config.PROFILE_SECRET
+    timestamp = str(int(timestamp if timestamp is not None else time.time()))
+    signature = hmac.new(secret.encode(), timestamp.encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}:{signature}"
+
+def verify_profile_token(token, secret=None, max_age=None):
+    """
+    True if token was signed with the secret within max_age seconds
+    """
+    secret = secret or Config.PROFILE_SECRET
+    max_age = Config.PROFILE_TOKEN_MAX_AGE if max_age is None else max_age
+    if not secret or not token or ':' not in token:
+        return False
+    timestamp, _ = token.split(':', 1)
+    try:
+        age = time.time() - int(timestamp)
+    except ValueError:
+        return False
+    if not -60 <= age <= max_age:
+        return False
+    return hmac.compare_digest(token, sign_profile_token(secret, timestamp))
+
+def _should_profile(request):
+    token = request.headers.get(Config.PROFILE_HEADER)
+    if token is not None and verify_profile_token(token):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+def _write_profile(profiler, endpoint, method, path, status, duration):
+    """
+    Write the profile and its JSON sidecar; returns the base file name
+    """
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    base = f"{stamp}-{endpoint.replace('.', '_')}-{int(duration * 1000)}ms-{uuid.uuid4().hex[:6]}"
+    extension = 'folded' if isinstance(profiler, StackSampler) else 'prof'
+    samples = profiler.write(os.path.join(Config.PROFILE_DIR, f"{base}.{extension}"))
+
+    with open(os.path.join(Config.PROFILE_DIR, f"{base}.json"), 'w') as f:
+        json.dump({
+            'endpoint': endpoint,
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'mode': Config.PROFILE_MODE,
+            'profile_file': f"{base}.{extension}",
+            'samples': samples,
+            'sample_interval': Config.PROFILE_SAMPLE_INTERVAL if samples is not None else None,
+            'created_at': datetime.utcnow().isoformat()
+        }, f, indent=2)
+    return base
+
+def init_app(app):
+    """
+    Register the profiling hooks, only if profiling can ever be triggered
+    """
+    if not Config.PROFILE_SECRET and Config.PROFILE_SAMPLE_RATE <= 0:
+        return app
+
+    from flask import g, request
+
+    def _stop(response_status):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return None
+        duration = time.perf_counter() - g.pop('profile_started')
+        profiler.stop()
+        try:
+            return _write_profile(profiler, request.endpoint or 'unmatched', request.method,
+                                  request.path, response_status, duration)
+        except Exception as e:
+            print(f"Error writing request profile: {str(e)}")
+            return None
+
+    @app.before_request
+    def start_profile():
+        if not _should_profile(request):
+            return
+        if Config.PROFILE_MODE == 'cprofile':
+            profiler = _CProfiler()
+        else:
+            profiler = StackSampler(threading.get_ident(), Config.PROFILE_SAMPLE_INTERVAL)
+        g.profile_started = time.perf_counter()
+        g.profiler = profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        # Streamed bodies are profiled up to the first byte
+        name = _stop(response.status_code)
+        if name is not None:
+            response.headers['X-Profile'] = name
+        return response
+
+    @app.teardown_request
+    def discard_profile(error=None):
+        # Requests that ended without a response still stop their profiler
+        _stop(500)
+
+    return app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print a signed header value that profiles one request')
+    parser.add_argument('--secret', default=None, help='defaults to PROFILE_SECRET')
+    args = parser.parse_args()
+
+    if not (args.secret or Config.PROFILE_SECRET):
+        parser.error('PROFILE_SECRET is not set')
+    print(f"{Config.PROFILE_HEADER}: {sign_profile_token(args.secret)}")
@@ -0,0 +1,173 @@
+"""
+Seeded synthetic price and weather data
+
+Every series is generated as a (markets x days) array in one pass, so years
+of history for dozens of markets take about as long as one. Weather shares
+a regional anomaly across markets (a hot, dry spell hits all of them) on top
+of seasonal cycles and local noise. Prices follow a national trend and
+random walk, a per-market basis, and react to the market's own trailing
+rainfall two weeks later, so price/weather correlations resemble real data
+and the weather features have something to find.
+
+    python -m utils.synthetic_data --start 2015-01-01 --end 2024-12-31 \\
+        --markets Jakarta Bandung Semarang --format columnar
+"""
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from config import Config
+from utils.columnar_store import DATASETS, write_partitions
+
+MARKETS = ['Jakarta', 'Bandung', 'Semarang', 'Boyolali', 'Magelang', 'Surabaya', 'Malang',
+           'Medan', 'Bengkulu', 'Lampung', 'Bogor', 'Garut', 'Temanggung', 'Wonosobo',
+           'Kediri', 'Jember', 'Padang', 'Aceh', 'Makassar', 'Denpasar']
+
+OUTPUT_FORMATS = ('csv', 'columnar', 'both')
+
+# Trailing rainfall window and the delay before it shows up in prices (days)
+RAIN_WINDOW = 30
+PRICE_RESPONSE_LAG = 14
+
+def market_names(count):
+    """
+    `count` distinct market names, numbering repeats past the built-in list
+    """
+    return [MARKETS[i % len(MARKETS)] + (f" {i // len(MARKETS) + 1}" if i >= len(MARKETS) else '')
+            for i in range(count)]
+
+def _ar1(noise, phi):
+    """
+    AR(1) process x[t] = phi * x[t-1] + e[t] along the last axis, with unit
+    stationary variance
+    """
+    smoothed = pd.DataFrame(noise.T).ewm(alpha=1 - phi, adjust=False).mean().values.T
+    return smoothed * np.sqrt((1 + phi) / (1 - phi))
+
+def _trailing_sum(values, window):
+    csum = np.concatenate([np.zeros((values.shape[0], 1)), np.cumsum(values, axis=1)], axis=1)
+    start = np.maximum(np.arange(values.shape[1]) + 1 - window, 0)
+    return csum[:, 1:] - csum[:, start]
+
+def _lag(values, days):
+    if days <= 0:
+        return values
+    lagged = np.zeros_like(values)
+    lagged[:, days:] = values[:, :-days]
+    return lagged
+
+def _to_frame(dates, names, columns):
+    """
+    Long (date, location, ...) frame from (markets x days) arrays; without
+    names the location column is left out
+    """
+    n_markets, n_days = next(iter(columns.values())).shape
+    data = {'date': pd.to_datetime(np.tile(dates, n_markets))}
+    if names is not None:
+        data['location'] = np.repeat(names, n_days)
+    for column, values in columns.items():
+        data[column] = values.ravel().round(2)
+    return pd.DataFrame(data)
+
+def generate_datasets(start=None, end=None, markets=None, seed=None):
+    """
+    Generate daily prices and weather for [start, end]
+
+    end defaults to today and start to 364 days before end. markets is a
+    list of names; None generates a single series without a location
+    column. The same arguments always give the same data.
+
+    Returns {'prices': DataFrame, 'weather': DataFrame}.
+    """
+    seed = Config.SAMPLE_DATA_SEED if seed is None else seed
+    end = np.datetime64(pd.Timestamp(end).date() if end is not None else 'today', 'D')
+    start = np.datetime64(pd.Timestamp(start).date(), 'D') if start is not None else end - 364
+    if start > end:
+        raise ValueError('start must not be after end')
+
+    dates = np.arange(start, end + 1, dtype='datetime64[D]')
+    n_days = len(dates)
+    names = list(markets) if markets is not None else None
+    n_markets = len(names) if names is not None else 1
+    rng = np.random.default_rng(seed)
+
+    # Seasonal phase from the calendar, so a date looks the same whatever the range
+    day_number = dates.astype(np.int64)
+    phase = 2 * np.pi * day_number / 365.25
+    dry_season = np.sin(phase)
+    years = (day_number - day_number[0]) / 365.25
+
+    # Per-market climate and market traits
+    temp_offset = rng.normal(0, 1.5, (n_markets, 1))
+    rain_scale = rng.uniform(0.7, 1.3, (n_markets, 1))
+    basis = rng.normal(0, 0.08, (n_markets, 1))
+
+    # Regional weather anomaly shared by all markets plus a local one each
+    regional = _ar1(rng.normal(size=(1, n_days)), 0.9)
+    local = _ar1(rng.normal(size=(n_markets, n_days)), 0.7)
+    anomaly = 0.7 * regional + 0.5 * local
+
+    temperature = 27 + temp_offset + 3 * dry_season + 1.2 * anomaly + rng.normal(0, 0.8, (n_markets, n_days))
+    wet_probability = np.clip(0.45 - 0.3 * dry_season - 0.12 * anomaly, 0.02, 0.95)
+    wet = rng.random((n_markets, n_days)) < wet_probability
+    rainfall = wet * rng.gamma(0.8, 18, (n_markets, n_days)) * rain_scale * (1 - 0.5 * dry_season)
+    recent_rain = _trailing_sum(rainfall, RAIN_WINDOW)
+    rain_mean = recent_rain.mean(axis=1, keepdims=True)
+    rain_std = recent_rain.std(axis=1, keepdims=True) + 1e-9
+    humidity = np.clip(70 + 1.5 * (27 - temperature) + 0.05 * (recent_rain - rain_mean) + 8 * wet
+                       + rng.normal(0, 4, (n_markets, n_days)), 30, 100)
+
+    # Prices: trend, national random walk, seasonality, market basis and noise
+    # (on a log scale), plus a lagged response to the market's rainfall surprise
+    national = np.cumsum(rng.normal(0, 0.006, (1, n_days)), axis=1)
+    rain_surprise = _lag((recent_rain - rain_mean) / rain_std, PRICE_RESPONSE_LAG)
+    log_price = (np.log(25000) + 0.03 * years + 0.08 * np.sin(2 * phase) + national + basis
+                 + 0.04 * rain_surprise + 0.02 * _ar1(rng.normal(size=(n_markets, n_days)), 0.8))
+    price = np.maximum(np.exp(log_price), 5000)
+
+    return {
+        'prices': _to_frame(dates, names, {'price': price}),
+        'weather': _to_frame(dates, names, {'temperature': temperature, 'rainfall': rainfall,
+                                            'humidity': humidity})
+    }
+
+def write_datasets(datasets, output_format='csv', data_dir=None):
+    """
+    Write generated frames as the raw CSVs under data_dir/raw (default
+    Config.DATA_PATH) and/or into the columnar store; returns row counts
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {', '.join(OUTPUT_FORMATS)}")
+    data_dir = Config.DATA_PATH if data_dir is None else data_dir
+
+    for name, df in datasets.items():
+        if output_format in ('csv', 'both'):
+            os.makedirs(os.path.join(data_dir, 'raw'), exist_ok=True)
+            df.to_csv(os.path.join(data_dir, 'raw', DATASETS[name]['source']), index=False,
+                      date_format='%Y-%m-%d')
+        if output_format in ('columnar', 'both'):
+            write_partitions(df, name)
+    return {name: len(df) for name, df in datasets.items()}
+
+def generate_and_write(start=None, end=None, markets=None, seed=None, output_format='csv', data_dir=None):
+    """
+    generate_datasets followed by write_datasets
+    """
+    return write_datasets(generate_datasets(start, end, markets, seed), output_format, data_dir)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate seeded synthetic ginger price and weather data')
+    parser.add_argument('--start', default=None, help='first date (default: 364 days before --end)')
+    parser.add_argument('--end', default=None, help='last date (default: today)')
+    parser.add_argument('--markets', nargs='+', default=None, help='market names')
+    parser.add_argument('--market-count', type=int, default=None, help='generate this many named markets instead')
+    parser.add_argument('--seed', type=int, default=None, help='defaults to SAMPLE_DATA_SEED')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('--data-dir', default=None, help='CSV output root (default: DATA_PATH)')
+    args = parser.parse_args()
+
+    markets = market_names(args.market_count) if args.market_count else args.markets
+    for name, rows in generate_and_write(args.start, args.end, markets, args.seed,
+                                         args.format, args.data_dir).items():
+        print(f"{name}: {rows} rows")
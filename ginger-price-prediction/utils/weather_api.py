@@ -1,8 +1,179 @@
 import requests
 import os
+import numpy as np
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import Config
+from utils.metrics import timed, inc, record_error, register_collector, cache_samples, UPSTREAM_REQUESTS
 from datetime import datetime
 
+class WeatherClient:
+    """
+    Pooled, timeout-bounded client for the weather provider
+    
+    A single requests.Session reuses connections across calls, every request
+    carries connect/read timeouts, and transient failures (connection errors,
+    429 and 5xx) are retried a bounded number of times with backoff.
+    Responses are cached per (city, endpoint): fresh entries are returned
+    directly, stale ones are returned immediately while a background refresh
+    runs, and only expired entries block on the provider.
+    """
+    
+    def __init__(self, base_url=None, api_key=None, ttl=None, stale_ttl=None,
+                 timeout=None, retries=None, pool_size=None):
+        self.base_url = (base_url or Config.WEATHER_API_BASE_URL).rstrip('/')
+        self.api_key = api_key
+        self.ttl = Config.WEATHER_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = Config.WEATHER_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self.timeout = timeout or (Config.WEATHER_CONNECT_TIMEOUT, Config.WEATHER_READ_TIMEOUT)
+        
+        retry = Retry(
+            total=Config.WEATHER_MAX_RETRIES if retries is None else retries,
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size or Config.WEATHER_POOL_SIZE,
+                              pool_maxsize=pool_size or Config.WEATHER_POOL_SIZE,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self._cache = {}
+        self._refreshing = set()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Global cap on concurrent upstream calls to respect provider quotas
+        self._concurrency = threading.BoundedSemaphore(Config.WEATHER_MAX_CONCURRENCY)
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'errors': 0}
+    
+    def _fetch(self, endpoint, city):
+        """
+        Call the provider and return the decoded JSON payload
+        """
+        params = {
+            'q': city,
+            'appid': self.api_key or Config.WEATHER_API_KEY,
+            'units': 'metric'
+        }
+        try:
+            with self._concurrency, timed('weather_upstream'):
+                response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
+                response.raise_for_status()
+                payload = response.json()
+        except Exception:
+            inc(UPSTREAM_REQUESTS, ('weather', 'error'))
+            raise
+        inc(UPSTREAM_REQUESTS, ('weather', 'ok'))
+        return payload
+    
+    def _refresh(self, key):
+        try:
+            payload = self._fetch(key[1], key[0])
+            with self._lock:
+                self._cache[key] = (time.monotonic(), payload)
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            print(f"Error refreshing weather {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+    
+    def get(self, endpoint, city):
+        """
+        Return the provider payload for (city, endpoint), using the cache
+        
+        Raises if the provider fails and there is no cached payload to serve.
+        """
+        key = (city, endpoint)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            age = now - entry[0] if entry is not None else None
+            if entry is not None and age <= self.ttl:
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry is not None and age <= self.ttl + self.stale_ttl:
+                # Serve stale and revalidate in the background, once per key
+                self.stats['stale_hits'] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+                return entry[1]
+            self.stats['misses'] += 1
+            
+            # Only one upstream call per key at a time; other callers wait for it
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = {'done': threading.Event()}
+                self._inflight[key] = flight
+        
+        if not leader:
+            flight['done'].wait()
+            if 'payload' in flight:
+                return flight['payload']
+            if entry is not None:
+                return entry[1]
+            raise flight['error']
+        
+        try:
+            payload = self._fetch(endpoint, city)
+            flight['payload'] = payload
+            with self._lock:
+                self._cache[key] = (time.monotonic(), payload)
+            return payload
+        except Exception as e:
+            flight['error'] = e
+            with self._lock:
+                self.stats['errors'] += 1
+            if entry is not None:
+                # Provider is down: an expired answer beats none
+                return entry[1]
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight['done'].set()
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+# Shared by all requests in this worker so connections and cached payloads are reused
+weather_client = WeatherClient()
+register_collector(lambda: cache_samples('weather', weather_client.stats,
+                                         ('hits', 'stale_hits', 'misses', 'errors')))
+
+def _format_current(data):
+    return {
+        'city': data['name'],
+        'temperature': data['main']['temp'],
+        'humidity': data['main']['humidity'],
+        'pressure': data['main']['pressure'],
+        'description': data['weather'][0]['description'],
+        'timestamp': datetime.now().isoformat()
+    }
+
+def _format_forecast(data, days):
+    forecast = []
+    for item in data['list'][:days]:
+        forecast.append({
+            'date': item['dt_txt'],
+            'temperature': item['main']['temp'],
+            'humidity': item['main']['humidity'],
+            'description': item['weather'][0]['description']
+        })
+    return forecast
+
 def get_current_weather(city="Jakarta"):
     """
     Get current weather data from API
@@ -14,30 +185,11 @@ def get_current_weather(city="Jakarta"):
             # Return sample data if no API key is provided
             return get_sample_weather_data(city)
         
-        url = f"http://api.openweathermap.org/data/2.5/weather"
-        params = {
-            'q': city,
-            'appid': api_key,
-            'units': 'metric'
-        }
-        
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                'city': data['name'],
-                'temperature': data['main']['temp'],
-                'humidity': data['main']['humidity'],
-                'pressure': data['main']['pressure'],
-                'description': data['weather'][0]['description'],
-                'timestamp': datetime.now().isoformat()
-            }
-        else:
-            # Return sample data in case of API error
-            return get_sample_weather_data(city)
+        return _format_current(weather_client.get('weather', city))
     
     except Exception as e:
         print(f"Error getting weather data: {str(e)}")
+        record_error('weather')
         return get_sample_weather_data(city)
 
 def get_weather_forecast(city="Jakarta", days=5):
@@ -51,33 +203,50 @@ def get_weather_forecast(city="Jakarta", days=5):
             # Return sample forecast data if no API key is provided
             return get_sample_forecast_data(city, days)
         
-        url = f"http://api.openweathermap.org/data/2.5/forecast"
-        params = {
-            'q': city,
-            'appid': api_key,
-            'units': 'metric'
-        }
-        
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            forecast = []
-            for item in data['list'][:days]:
-                forecast.append({
-                    'date': item['dt_txt'],
-                    'temperature': item['main']['temp'],
-                    'humidity': item['main']['humidity'],
-                    'description': item['weather'][0]['description']
-                })
-            return forecast
-        else:
-            # Return sample forecast data in case of API error
-            return get_sample_forecast_data(city, days)
+        return _format_forecast(weather_client.get('forecast', city), days)
     
     except Exception as e:
         print(f"Error getting weather forecast: {str(e)}")
+        record_error('weather')
         return get_sample_forecast_data(city, days)
 
+# Worker threads for bulk fetches; upstream concurrency is capped by the client
+_bulk_executor = ThreadPoolExecutor(max_workers=Config.WEATHER_MAX_CONCURRENCY,
+                                    thread_name_prefix='weather')
+
+def get_weather_bulk(cities=None, endpoint='weather', days=5):
+    """
+    Get current weather (or forecasts, with endpoint='forecast') for many
+    cities concurrently
+    
+    Duplicate cities are fetched once, and concurrent requests for a city
+    that is already being fetched share that call. A failing city is
+    reported in 'errors' without affecting the others.
+    """
+    cities = list(dict.fromkeys(cities or Config.GINGER_REGIONS))
+    results, errors = {}, {}
+    
+    if not Config.WEATHER_API_KEY:
+        for city in cities:
+            if endpoint == 'forecast':
+                results[city] = get_sample_forecast_data(city, days)
+            else:
+                results[city] = get_sample_weather_data(city)
+        return {'weather': results, 'errors': errors}
+    
+    futures = {city: _bulk_executor.submit(weather_client.get, endpoint, city) for city in cities}
+    for city, future in futures.items():
+        try:
+            data = future.result()
+            if endpoint == 'forecast':
+                results[city] = _format_forecast(data, days)
+            else:
+                results[city] = _format_current(data)
+        except Exception as e:
+            errors[city] = str(e)
+    
+    return {'weather': results, 'errors': errors}
+
 def get_sample_weather_data(city="Jakarta"):
     """
     Get sample weather data for demonstration
@@ -112,35 +281,73 @@ def get_sample_forecast_data(city="Jakarta", days=5):
     
     return forecast
 
+def _day_uniforms(key, ordinals, stream):
+    """
+    Uniform [0, 1) draws that depend only on (key, day ordinal, stream):
+    splitmix64 over a per-day counter, vectorized
+    """
+    with np.errstate(over='ignore'):
+        z = (np.uint64(key) + ordinals.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+             + np.uint64(stream) * np.uint64(0xD1B54A32D192ED03))
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+def generate_historical_weather(start, end, city="Jakarta", seed=None):
+    """
+    Generate sample daily weather between two dates (inclusive) as arrays
+    
+    Each day is derived from Config.SAMPLE_DATA_SEED, the city and that
+    day's date alone, so it has the same values whatever range it is
+    requested (or backfilled) in.
+    """
+    n_days = (end - start).days + 1
+    if n_days <= 0:
+        return {'date': np.array([], dtype='datetime64[D]'), 'temperature': np.array([]),
+                'humidity': np.array([], dtype=int), 'rainfall': np.array([])}
+    
+    seed = Config.SAMPLE_DATA_SEED if seed is None else seed
+    key = (int(seed) << 32 | zlib.crc32(city.encode())) & 0xFFFFFFFFFFFFFFFF
+    ordinals = np.arange(start.toordinal(), end.toordinal() + 1)
+    temperature, humidity, rain, amount = (_day_uniforms(key, ordinals, stream) for stream in range(4))
+    return {
+        'date': np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1),
+        'temperature': np.round(22 + 16 * temperature, 1),
+        'humidity': 50 + (humidity * 46).astype(int),
+        'rainfall': np.where(rain > 0.7, np.round(20 * amount, 1), 0.0)
+    }
+
 def get_historical_weather(start_date, end_date, city="Jakarta"):
     """
     Get historical weather data for a date range
+    
+    Inside an app context the range is served from the WeatherData table and
+    only the days it is missing are fetched and stored first (see
+    utils.weather_history); without one the days are generated directly.
     """
     try:
+        from flask import has_app_context
+        if has_app_context():
+            from utils.weather_history import get_stored_historical_weather
+            return get_stored_historical_weather(start_date, end_date, city)
+        
         # This would normally call a weather API that provides historical data
         # For demo purposes, we'll generate sample data
-        from datetime import datetime, timedelta
-        
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-        
-        weather_data = []
-        current_date = start
-        day_count = 0
-        
-        while current_date <= end:
-            import random
-            weather_data.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'temperature': round(random.uniform(22, 38), 1),
-                'humidity': random.randint(50, 95),
-                'rainfall': round(random.uniform(0, 20), 1) if random.random() > 0.7 else 0
-            })
-            current_date += timedelta(days=1)
-            day_count += 1
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        return weather_data
+        generated = generate_historical_weather(start, end, city)
+        return [
+            {'date': date, 'temperature': temperature, 'humidity': humidity, 'rainfall': rainfall}
+            for date, temperature, humidity, rainfall in zip(
+                np.datetime_as_string(generated['date']).tolist(),
+                generated['temperature'].tolist(),
+                generated['humidity'].tolist(),
+                generated['rainfall'].tolist()
+            )
+        ]
     
     except Exception as e:
         print(f"Error getting historical weather: {str(e)}")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,103 @@
+import numpy as np
+from datetime import datetime
+from database.models import db, WeatherData
+from database.ingest import upsert_rows
+from utils.weather_api import generate_historical_weather
+
+def _parse_day(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value if not isinstance(value, datetime) else value.date()
+
+def find_missing_ranges(start, end, stored_dates):
+    """
+    Contiguous (start, end) date ranges in [start, end] not in stored_dates
+    """
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    if not len(days):
+        return []
+    stored = np.array(sorted(stored_dates), dtype='datetime64[D]')
+    missing = days[~np.isin(days, stored)]
+    if not len(missing):
+        return []
+
+    # Split wherever consecutive missing days are more than one day apart
+    breaks = np.flatnonzero(np.diff(missing) != np.timedelta64(1, 'D')) + 1
+    return [(run[0].item(), run[-1].item()) for run in np.split(missing, breaks)]
+
+def backfill_weather(start, end, city="Jakarta"):
+    """
+    Fill only the (city, date) gaps in WeatherData between start and end,
+    inserting every missing day in one transaction. Returns rows inserted.
+    """
+    start, end = _parse_day(start), _parse_day(end)
+    stored = db.session.query(WeatherData.date).filter(
+        WeatherData.location == city,
+        WeatherData.date >= start,
+        WeatherData.date <= end
+    ).all()
+    gaps = find_missing_ranges(start, end, [row.date for row in stored])
+    if not gaps:
+        return 0
+
+    now = datetime.utcnow()
+    rows = []
+    for gap_start, gap_end in gaps:
+        generated = generate_historical_weather(gap_start, gap_end, city)
+        rows.extend(
+            {'date': date, 'temperature': temperature, 'humidity': humidity,
+             'rainfall': rainfall, 'location': city, 'created_at': now}
+            for date, temperature, humidity, rainfall in zip(
+                generated['date'].tolist(),
+                generated['temperature'].tolist(),
+                generated['humidity'].tolist(),
+                generated['rainfall'].tolist()
+            )
+        )
+
+    try:
+        # One executemany in one transaction; days another worker filled
+        # concurrently are skipped by the (location, date) unique index
+        upsert_rows(WeatherData, rows, update=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+def _stored_rows(start, end, city):
+    return db.session.query(
+        WeatherData.date, WeatherData.temperature, WeatherData.humidity, WeatherData.rainfall
+    ).filter(
+        WeatherData.location == city,
+        WeatherData.date >= start,
+        WeatherData.date <= end
+    ).order_by(WeatherData.date).all()
+
+def get_stored_historical_weather(start_date, end_date, city="Jakarta"):
+    """
+    Get historical weather for a date range from the WeatherData table
+
+    A fully stored range is one indexed read; otherwise only the missing
+    days are backfilled before reading it again.
+    """
+    try:
+        start, end = _parse_day(start_date), _parse_day(end_date)
+        rows = _stored_rows(start, end, city)
+        if find_missing_ranges(start, end, [row.date for row in rows]):
+            backfill_weather(start, end, city)
+            rows = _stored_rows(start, end, city)
+
+        return [
+            {
+                'date': row.date.strftime('%Y-%m-%d'),
+                'temperature': row.temperature,
+                'humidity': row.humidity,
+                'rainfall': row.rainfall
+            }
+            for row in rows
+        ]
+
+    except Exception as e:
+        print(f"Error getting stored historical weather: {str(e)}")
+        return []
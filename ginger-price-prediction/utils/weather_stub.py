@@ -0,0 +1,126 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class StubWeatherServer:
+    """
+    Local stand-in for the OpenWeatherMap endpoints used by utils.weather_api
+
+    Serves /weather and /forecast on 127.0.0.1 with OpenWeatherMap-shaped
+    JSON. latency (seconds) and error_rate (0-1, answered with error_status)
+    can be changed while the server runs to simulate a slow or failing
+    provider. Use as a context manager or call start()/stop().
+    """
+
+    def __init__(self, port=0, latency=0.0, error_rate=0.0, error_status=503, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub._random.random() < stub.error_rate
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                url = urlparse(self.path)
+                city = parse_qs(url.query).get('q', ['Jakarta'])[0]
+                endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+
+                if fail:
+                    return self._send(stub.error_status, {'cod': stub.error_status, 'message': 'stub error'})
+                if endpoint == 'weather':
+                    return self._send(200, stub._current(city))
+                if endpoint == 'forecast':
+                    return self._send(200, stub._forecast(city))
+                return self._send(404, {'cod': 404, 'message': 'not found'})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _current(self, city):
+        with self._lock:
+            temp = round(self._random.uniform(25, 35), 1)
+            humidity = self._random.randint(60, 90)
+        return {
+            'name': city,
+            'main': {'temp': temp, 'humidity': humidity, 'pressure': 1010},
+            'weather': [{'description': 'partly cloudy'}]
+        }
+
+    def _forecast(self, city):
+        now = datetime.now()
+        items = []
+        for i in range(40):  # 5 days in 3-hour steps, like the real API
+            with self._lock:
+                temp = round(self._random.uniform(25, 35), 1)
+                humidity = self._random.randint(60, 90)
+            items.append({
+                'dt_txt': (now + timedelta(hours=3 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+                'main': {'temp': temp, 'humidity': humidity},
+                'weather': [{'description': 'light rain'}]
+            })
+        return {'city': {'name': city}, 'list': items}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local stub weather provider')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubWeatherServer(args.port, args.latency, args.error_rate)
+    print(f"Stub weather provider on {server.base_url} (set WEATHER_API_BASE_URL to use it)")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()